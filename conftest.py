@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def inline_thumbnails(settings):
+    # Фоновый поток миниатюр пережил бы тест и писал бы во временный
+    # MEDIA_ROOT фикстуры mock_media уже после его удаления.
+    settings.THUMBNAIL_WORKERS = 0
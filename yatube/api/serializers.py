@@ -0,0 +1,82 @@
+from posts.counters import stats_for
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def _image(post, request):
+    return request.build_absolute_uri(post.image.url) if post.image else None
+
+
+# Поле ответа: (колонки для QuerySet.only(), функция значения).
+POST_FIELDS = {
+    'id': (('id',), lambda post, request: post.id),
+    'text': (('text',), lambda post, request: post.text),
+    'pub_date': (('pub_date',), lambda post, request: post.pub_date),
+    'author': (('author__username',),
+               lambda post, request: post.author.username),
+    'group': (('group__slug',),
+              lambda post, request: post.group.slug if post.group else None),
+    'image': (('image',), _image),
+}
+POST_RELATIONS = {'author': 'author', 'group': 'group'}
+DETAIL_FIELDS = (*POST_FIELDS, 'comments')
+PROFILE_FIELDS = ('username', 'full_name', 'posts', 'followers',
+                  'following', 'comments')
+
+
+def requested_fields(request, allowed):
+    """Поля из параметра fields=a,b; без параметра — все разрешённые."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return tuple(allowed)
+    fields = tuple(dict.fromkeys(
+        field.strip() for field in raw.split(',') if field.strip()
+    ))
+    unknown = [field for field in fields if field not in allowed]
+    if unknown or not fields:
+        raise FieldsError(
+            f'Неизвестные поля: {", ".join(unknown)}. '
+            f'Доступны: {", ".join(allowed)}'
+        )
+    return fields
+
+
+def narrow_posts(posts, fields):
+    """Загружает из базы только колонки запрошенных полей.
+
+    id и pub_date нужны курсору и загружаются всегда.
+    """
+    columns = {'id', 'pub_date'}
+    relations = []
+    for field in fields:
+        if field not in POST_FIELDS:
+            continue
+        columns.update(POST_FIELDS[field][0])
+        if field in POST_RELATIONS:
+            relations.append(POST_RELATIONS[field])
+    return posts.select_related(*relations).only(*columns)
+
+
+def post_data(post, fields, request):
+    return {field: POST_FIELDS[field][1](post, request)
+            for field in fields if field in POST_FIELDS}
+
+
+def comment_data(comment):
+    return {'id': comment.id,
+            'author': comment.author.username,
+            'text': comment.text,
+            'created': comment.created}
+
+
+def profile_data(user, fields):
+    stats = stats_for(user)
+    values = {'username': user.username,
+              'full_name': user.get_full_name(),
+              'posts': stats.posts,
+              'followers': stats.followers,
+              'following': stats.following,
+              'comments': stats.comments}
+    return {field: values[field] for field in fields}
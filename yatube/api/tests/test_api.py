@@ -0,0 +1,165 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(API_PAGE_SIZE=3)
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.author = User.objects.create_user(username='Author',
+                                              first_name='Лев',
+                                              last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(5):
+            cls.post = Post.objects.create(author=cls.author,
+                                           group=cls.group,
+                                           text=f'Пост {i}')
+        Comment.objects.create(post=cls.post, author=cls.user,
+                               text='Коммент')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_post_lists_are_cursor_paginated(self):
+        '''Списки постов листаются курсором до конца и обратно'''
+        urls = (
+            reverse('api:posts'),
+            reverse('api:group_posts', args=(self.group.slug,)),
+            reverse('api:profile_posts', args=(self.author.username,)),
+            reverse('api:follow_posts'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.authorized_client.get(url).json()
+                self.assertEqual([post['text'] for post in first['results']],
+                                 ['Пост 4', 'Пост 3', 'Пост 2'])
+                self.assertIsNone(first['previous'])
+                second = self.authorized_client.get(first['next']).json()
+                self.assertEqual(
+                    [post['text'] for post in second['results']],
+                    ['Пост 1', 'Пост 0'],
+                )
+                self.assertIsNone(second['next'])
+                back = self.authorized_client.get(second['previous']).json()
+                self.assertEqual(back['results'], first['results'])
+
+    def test_fields_narrow_select(self):
+        '''fields= сужает и ответ, и SELECT'''
+        url = reverse('api:posts')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(url, {'fields': 'id,author'})
+        self.assertEqual(set(response.json()['results'][0]),
+                         {'id', 'author'})
+        select = next(query['sql'] for query in queries
+                      if 'FROM "posts_post"' in query['sql'])
+        self.assertIn('"auth_user"."username"', select)
+        self.assertNotIn('"posts_post"."text"', select)
+        self.assertNotIn('posts_group', select)
+
+    def test_unknown_field_is_400(self):
+        '''Неизвестное поле в fields= даёт ошибку 400'''
+        response = self.guest_client.get(reverse('api:posts'),
+                                         {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_post_detail_with_comments(self):
+        '''Пост отдаётся с комментариями и обновляется после нового'''
+        url = reverse('api:post_detail', args=(self.post.id,))
+        data = self.guest_client.get(url).json()
+        self.assertEqual(data['text'], 'Пост 4')
+        self.assertEqual(data['group'], self.group.slug)
+        self.assertEqual([comment['text'] for comment in data['comments']],
+                         ['Коммент'])
+        etag = self.guest_client.get(url)['ETag']
+        self.assertEqual(
+            self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            304,
+        )
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Ответ')
+        data = self.guest_client.get(url).json()
+        self.assertEqual(len(data['comments']), 2)
+        self.assertIsNone(data['comments_next'])
+
+    def test_post_comments_are_cursor_paginated(self):
+        '''В посте только первая пачка комментариев, остальные
+        листаются курсором по ссылке comments_next'''
+        for i in range(4):
+            Comment.objects.create(post=self.post, author=self.author,
+                                   text=f'Ответ {i}')
+        url = reverse('api:post_detail', args=(self.post.id,))
+        data = self.guest_client.get(url).json()
+        texts = [comment['text'] for comment in data['comments']]
+        self.assertEqual(texts, ['Ответ 3', 'Ответ 2', 'Ответ 1'])
+        page = self.guest_client.get(data['comments_next']).json()
+        self.assertEqual([comment['text'] for comment in page['results']],
+                         ['Ответ 0', 'Коммент'])
+        self.assertIsNone(page['next'])
+        back = self.guest_client.get(page['previous']).json()
+        self.assertEqual(back['results'], data['comments'])
+
+    def test_cached_detail_keeps_host(self):
+        '''Закэшированный пост не отдаёт ссылки чужого хоста'''
+        post = Post.objects.create(author=self.author, text='С картинкой',
+                                   image='posts/picture.jpg')
+        url = reverse('api:post_detail', args=(post.id,))
+        for host in ('localhost', '127.0.0.1'):
+            with self.subTest(host=host):
+                data = self.guest_client.get(url, HTTP_HOST=host).json()
+                self.assertTrue(data['image'].startswith(f'http://{host}/'))
+
+    def test_profile(self):
+        '''Профиль отдаёт имя и счётчики'''
+        url = reverse('api:profile', args=(self.author.username,))
+        data = self.guest_client.get(url).json()
+        self.assertEqual(data['full_name'], 'Лев Толстой')
+        self.assertEqual(data['posts'], 5)
+        self.assertEqual(data['followers'], 1)
+        data = self.guest_client.get(url, {'fields': 'followers'}).json()
+        self.assertEqual(data, {'followers': 1})
+
+    def test_responses_are_cached(self):
+        '''Повторный запрос списка отдаётся из кэша без обращения к базе'''
+        url = reverse('api:posts')
+        self.guest_client.get(url)
+        with self.assertNumQueries(0):
+            self.guest_client.get(url)
+        Post.objects.create(author=self.author, text='Новый пост')
+        response = self.guest_client.get(url)
+        self.assertEqual(response.json()['results'][0]['text'], 'Новый пост')
+
+    def test_errors_are_json(self):
+        '''Ошибки API отдаются в JSON'''
+        cases = (
+            (self.guest_client, reverse('api:post_detail', args=(999,)), 404),
+            (self.guest_client, reverse('api:group_posts', args=('no',)),
+             404),
+            (self.guest_client, reverse('api:follow_posts'), 401),
+        )
+        for client, url, status in cases:
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertEqual(response.status_code, status)
+                self.assertIn('detail', response.json())
+        response = self.authorized_client.post(reverse('api:posts'))
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response['Allow'], 'GET')
+        self.assertIn('detail', response.json())
@@ -0,0 +1,36 @@
+from core.queries import budget
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [path('posts/',
+                    budget(views.index, 3),
+                    name='posts'
+                    ),
+               path('posts/<int:post_id>/',
+                    budget(views.post_detail, 5),
+                    name='post_detail'
+                    ),
+               path('posts/<int:post_id>/comments/',
+                    budget(views.post_comments, 4),
+                    name='post_comments'
+                    ),
+               path('groups/<slug:slug>/posts/',
+                    budget(views.group_posts, 4),
+                    name='group_posts'
+                    ),
+               path('profiles/<str:username>/',
+                    budget(views.profile, 4),
+                    name='profile'
+                    ),
+               path('profiles/<str:username>/posts/',
+                    budget(views.profile_posts, 4),
+                    name='profile_posts'
+                    ),
+               path('follow/posts/',
+                    budget(views.follow_posts, 5),
+                    name='follow_posts'
+                    ),
+               ]
@@ -0,0 +1,171 @@
+from functools import wraps
+from hashlib import md5
+
+from core import caches
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from posts import timeline
+from posts.conditional import (conditional_page, group_etag, index_etag,
+                               post_etag, profile_etag)
+from posts.generations import cache_by_generation
+from posts.models import Comment, Group, Post, User
+from posts.views import COMMENT_KEYS
+from utils.paginator import CURSOR_KEYS, CURSOR_PARAMS, CursorPaginator
+
+from .serializers import (DETAIL_FIELDS, POST_FIELDS, PROFILE_FIELDS,
+                          FieldsError, comment_data, narrow_posts, post_data,
+                          profile_data, requested_fields)
+
+
+def api_view(view):
+    """Только GET; ошибки отдаются в JSON, а не HTML-страницами."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            response = JsonResponse({'detail': 'Метод не разрешён'},
+                                    status=405)
+            response['Allow'] = 'GET'
+            return response
+        try:
+            return view(request, *args, **kwargs)
+        except FieldsError as error:
+            return JsonResponse({'detail': str(error)}, status=400)
+        except Http404:
+            return JsonResponse({'detail': 'Не найдено'}, status=404)
+    return wrapper
+
+
+def cursor_link(request, param, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    for name in CURSOR_PARAMS:
+        params.pop(name, None)
+    params[param] = cursor
+    return request.build_absolute_uri('?' + params.urlencode())
+
+
+def post_list(request, posts, keys=CURSOR_KEYS):
+    fields = requested_fields(request, POST_FIELDS)
+    after, before = (request.GET.get(param) for param in CURSOR_PARAMS)
+    page = CursorPaginator(
+        narrow_posts(posts, fields), settings.API_PAGE_SIZE, keys
+    ).get_page(after, before)
+    return JsonResponse({
+        'results': [post_data(post, fields, request) for post in page],
+        'next': cursor_link(request, 'after', page.next_cursor),
+        'previous': cursor_link(request, 'before', page.previous_cursor),
+    })
+
+
+@conditional_page(index_etag)
+@cache_by_generation('index')
+@api_view
+def index(request):
+    return post_list(request, Post.objects.all())
+
+
+@conditional_page(group_etag)
+@cache_by_generation('group', 'slug')
+@api_view
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return post_list(request, group.posts.all())
+
+
+@conditional_page(profile_etag)
+@cache_by_generation('profile', 'username')
+@api_view
+def profile_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    return post_list(request, Post.objects.filter(author=author))
+
+
+@conditional_page(profile_etag)
+@cache_by_generation('profile', 'username')
+@api_view
+def profile(request, username):
+    fields = requested_fields(request, PROFILE_FIELDS)
+    user = get_object_or_404(
+        User.objects.only('username', 'first_name', 'last_name'),
+        username=username,
+    )
+    return JsonResponse(profile_data(user, fields))
+
+
+@api_view
+def follow_posts(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({'detail': 'Нужна авторизация'}, status=401)
+    return post_list(request, timeline.feed(request.user),
+                     keys=timeline.FEED_KEYS)
+
+
+def cache_key(prefix, request):
+    """Ключ ответа под ETag страницы. Ссылки и картинки в ответе
+    абсолютные, поэтому в ключ входит полный адрес вместе с хостом."""
+    url = md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'{prefix}:{request.etag}:{url}'
+
+
+def comment_list(request, post_id):
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    ).only('text', 'created', 'author__username')
+    after, before = (request.GET.get(param) for param in CURSOR_PARAMS)
+    return CursorPaginator(
+        comments, settings.API_PAGE_SIZE, COMMENT_KEYS
+    ).get_page(after, before)
+
+
+@conditional_page(post_etag)
+@api_view
+def post_detail(request, post_id):
+    """Пост с первой пачкой комментариев кэшируется под своим ETag:
+    он меняется с каждым новым комментарием и правкой поста, автора
+    или группы. Остальные комментарии листаются по comments_next."""
+    if request.etag is None:
+        raise Http404
+    fields = requested_fields(request, DETAIL_FIELDS)
+    key = cache_key('api-post', request)
+    data = cache.get(key)
+    if data is None:
+        post = get_object_or_404(
+            narrow_posts(Post.objects.all(), fields), pk=post_id
+        )
+        data = post_data(post, fields, request)
+        if 'comments' in fields:
+            comments = comment_list(request, post_id)
+            data['comments'] = [comment_data(comment)
+                                for comment in comments]
+            data['comments_next'] = None
+            if comments.has_next():
+                data['comments_next'] = request.build_absolute_uri(
+                    reverse('api:post_comments', args=(post_id,))
+                    + '?after=' + comments.next_cursor
+                )
+        cache.set(key, data, caches.timeout(settings.PAGE_CACHE_TIMEOUT))
+    return JsonResponse(data)
+
+
+@conditional_page(post_etag)
+@api_view
+def post_comments(request, post_id):
+    """Комментарии поста от новых к старым с курсорной пагинацией."""
+    if request.etag is None:
+        raise Http404
+    key = cache_key('api-comments', request)
+    data = cache.get(key)
+    if data is None:
+        page = comment_list(request, post_id)
+        data = {
+            'results': [comment_data(comment) for comment in page],
+            'next': cursor_link(request, 'after', page.next_cursor),
+            'previous': cursor_link(request, 'before',
+                                    page.previous_cursor),
+        }
+        cache.set(key, data, caches.timeout(settings.PAGE_CACHE_TIMEOUT))
+    return JsonResponse(data)
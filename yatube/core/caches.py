@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def is_shared():
+    """Видят ли кэш все процессы сервера: у LocMemCache он свой
+    в каждом процессе."""
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def timeout(seconds):
+    """Срок записи, которую сбрасывает запись в базу.
+
+    Сброс в общем кэше виден всем процессам, и запись живёт seconds
+    (None — бессрочно). В LocMemCache его видит только процесс, который
+    писал, поэтому срок урезается до LOCAL_CACHE_TIMEOUT: дольше другие
+    процессы устаревшее не отдают.
+    """
+    if is_shared():
+        return seconds
+    if seconds is None:
+        return settings.LOCAL_CACHE_TIMEOUT
+    return min(seconds, settings.LOCAL_CACHE_TIMEOUT)
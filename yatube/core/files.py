@@ -0,0 +1,120 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def byte_range(header, size):
+    """(начало, конец) из заголовка Range с одним диапазоном.
+
+    Несколько диапазонов и непонятный заголовок дают None:
+    такой запрос получает файл целиком.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or not any(match.groups()):
+        return None
+    start, end = match.groups()
+    if not start:
+        start, end = max(size - int(end), 0), size - 1
+        if end < start:
+            raise RangeNotSatisfiable
+        return start, end
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def _read(file_, start, length):
+    with file_:
+        file_.seek(start)
+        while length > 0:
+            chunk = file_.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def file_response(request, path, cache_control, etag=None, accel_url=None):
+    """Отдаёт файл с диска с ETag и Last-Modified, отвечает 304
+    на условные запросы и 206 на Range с одним диапазоном.
+
+    Файл целиком уходит через FileResponse, чтобы сервер мог
+    отдать его через wsgi.file_wrapper без копирования. При
+    MEDIA_OFFLOAD байты отдаёт веб-сервер по X-Sendfile или по
+    X-Accel-Redirect на accel_url.
+    """
+    stat = os.stat(path)
+    if etag is None:
+        etag = f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+    headers = {
+        'ETag': quote_etag(etag),
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': cache_control,
+        'Accept-Ranges': 'bytes',
+    }
+    response = get_conditional_response(
+        request, etag=headers['ETag'], last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        response = _offload(path, accel_url) or _content(
+            request, path, stat.st_size, headers['ETag']
+        )
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def _content_type(path):
+    return mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+
+def _offload(path, accel_url):
+    mode = settings.MEDIA_OFFLOAD
+    if mode == 'x-sendfile':
+        response = HttpResponse(content_type=_content_type(path))
+        response['X-Sendfile'] = path
+        return response
+    if mode == 'x-accel-redirect' and accel_url:
+        response = HttpResponse(content_type=_content_type(path))
+        response['X-Accel-Redirect'] = quote(accel_url)
+        return response
+    return None
+
+
+def _content(request, path, size, etag):
+    content_type = _content_type(path)
+    header = request.META.get('HTTP_RANGE', '')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if header and if_range in (None, etag):
+        try:
+            requested = byte_range(header, size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        if requested:
+            start, end = requested
+            response = StreamingHttpResponse(
+                _read(open(path, 'rb'), start, end - start + 1),
+                status=206, content_type=content_type,
+            )
+            response['Content-Length'] = end - start + 1
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            return response
+    return FileResponse(open(path, 'rb'), content_type=content_type)
@@ -0,0 +1,104 @@
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from . import timing
+from .queries import QueryBudgetExceeded, QueryRecorder
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class QueryBudgetMiddleware:
+    """Считает SQL-запросы каждого view, ищет повторяющиеся формы запросов
+    и сверяет их число с бюджетом, объявленным через core.queries.budget.
+
+    Для GET и HEAD берётся бюджет чтения, для остальных методов —
+    бюджет записи. В режиме QUERY_BUDGET_STRICT нарушение поднимает
+    QueryBudgetExceeded, иначе пишется предупреждение в лог.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_BUDGET_ENABLED:
+            return self.get_response(request)
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        self.check(request, recorder)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        attr = ('query_budget' if request.method in SAFE_METHODS
+                else 'write_budget')
+        request.query_budget = getattr(view_func, attr, None)
+
+    def check(self, request, recorder):
+        problems = []
+        limit = getattr(request, 'query_budget', None)
+        if limit is not None and len(recorder) > limit:
+            problems.append(
+                f'{len(recorder)} запросов при бюджете {limit}'
+            )
+        repeated = recorder.repeated(settings.QUERY_REPEAT_LIMIT)
+        for sql, count in repeated.items():
+            problems.append(f'N+1: {count} раз {sql}')
+        if not problems:
+            return
+        message = f'{request.method} {request.path}: ' + '; '.join(problems)
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class ServerTimingMiddleware:
+    """Отдаёт время БД, шаблонов и миниатюр в заголовке Server-Timing
+    и пишет его же строкой JSON в лог.
+
+    При выключенном SERVER_TIMING_ENABLED исключается из цепочки целиком.
+    """
+
+    METRICS = (
+        ('db', 'SQL'),
+        ('tpl', 'Templates'),
+        ('thumbnail', 'Thumbnails'),
+    )
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING_ENABLED:
+            raise MiddlewareNotUsed
+        timing.patch_template_render()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        token = timing.start()
+        try:
+            with connection.execute_wrapper(timing.measure_sql):
+                response = self.get_response(request)
+        finally:
+            timings = timing.stop(token)
+        total = time.perf_counter() - started
+        entries = []
+        record = {'method': request.method, 'path': request.path,
+                  'status': response.status_code,
+                  'total_ms': round(total * 1000, 2)}
+        for name, description in self.METRICS:
+            duration = timings.durations.get(name, 0) * 1000
+            count = timings.counts.get(name, 0)
+            entries.append(
+                f'{name};dur={duration:.2f};desc="{description} ({count})"'
+            )
+            record[f'{name}_ms'] = round(duration, 2)
+            record[f'{name}_count'] = count
+        entries.append(f'total;dur={total * 1000:.2f}')
+        response['Server-Timing'] = ', '.join(entries)
+        logger.info(json.dumps(record, ensure_ascii=False))
+        return response
@@ -0,0 +1,70 @@
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+PLACEHOLDER_LISTS = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+
+_unbudgeted = ContextVar('unbudgeted', default=False)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def shape(sql):
+    """Форма запроса: SQL без литералов и с одинаковыми списками IN."""
+    sql = LITERALS.sub('?', sql)
+    return PLACEHOLDER_LISTS.sub('(?)', sql)
+
+
+class QueryRecorder:
+    """Обёртка для connection.execute_wrapper, запоминающая запросы."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not _unbudgeted.get():
+            self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def repeated(self, limit):
+        """Формы запросов, выполненных больше limit раз (признак N+1)."""
+        shapes = Counter(shape(sql) for sql in self.queries)
+        return {sql: count for sql, count in shapes.items() if count > limit}
+
+
+@contextmanager
+def unbudgeted():
+    """Запросы внутри блока не входят в бюджет view.
+
+    Для разовой работы при первом обращении — пересчёта пропавших
+    счётчиков, нарезки миниатюры: бюджет описывает запрос к уже
+    прогретым данным.
+    """
+    token = _unbudgeted.set(True)
+    try:
+        yield
+    finally:
+        _unbudgeted.reset(token)
+
+
+def budget(view, queries, writes=None):
+    """Объявляет для view предельное число SQL-запросов на запрос.
+
+    writes — предел для POST и других изменяющих запросов: запись
+    тянет за собой сигналы, счётчики и сброс кэша. По умолчанию тот же,
+    что для чтения.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        return view(request, *args, **kwargs)
+    wrapper.query_budget = queries
+    wrapper.write_budget = queries if writes is None else writes
+    return wrapper
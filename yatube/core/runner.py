@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class QueryBudgetRunner(DiscoverRunner):
+    """Прогоняет тесты со строгими бюджетами запросов: превышение
+    бюджета или N+1 на любом запросе роняет тест."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_BUDGET_ENABLED = True
+        settings.QUERY_BUDGET_STRICT = True
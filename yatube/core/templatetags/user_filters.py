@@ -1,4 +1,5 @@
 from django import template
+from utils import paginator
 
 register = template.Library()
 
@@ -6,3 +7,8 @@ register = template.Library()
 @register.filter
 def addclass(field, css):
     return field.as_widget(attrs={'class': css})
+
+
+@register.filter
+def page_window(page):
+    return paginator.page_window(page)
@@ -0,0 +1,63 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+_timings = ContextVar('timings', default=None)
+
+
+class Timings:
+    def __init__(self):
+        self.durations = {}
+        self.counts = {}
+
+    def add(self, name, duration):
+        self.durations[name] = self.durations.get(name, 0) + duration
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+
+def start():
+    return _timings.set(Timings())
+
+
+def stop(token):
+    timings = _timings.get()
+    _timings.reset(token)
+    return timings
+
+
+@contextmanager
+def measure(name):
+    """Добавляет длительность блока к метрике name текущего запроса.
+
+    Вне запроса с включённым профилированием ничего не измеряет.
+    """
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def measure_sql(execute, sql, params, many, context):
+    with measure('db'):
+        return execute(sql, params, many, context)
+
+
+def patch_template_render():
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'timed', False):
+        return
+    original = Template.render
+
+    @wraps(original)
+    def render(self, *args, **kwargs):
+        with measure('tpl'):
+            return original(self, *args, **kwargs)
+    render.timed = True
+    Template.render = render
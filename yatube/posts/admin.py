@@ -1,14 +1,114 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin import widgets
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.template.response import TemplateResponse
+from django.urls import reverse
+from django.utils.text import Truncator
+from utils.paginator import EstimatedCountPaginator
 
-from .models import Comment, Follow, Group, Post
+from . import generations, search
+from .models import Comment, Follow, Group, Post, User
+from .signals import invalidate_authors, invalidate_groups
+
+
+class GroupIdWidget(widgets.ForeignKeyRawIdWidget):
+    """Поле id группы с подписью из уже загруженного объекта.
+
+    Стандартный виджет ищет подпись отдельным запросом на каждую строку
+    списка; здесь группа берётся из list_select_related строки.
+    """
+
+    group = None
+
+    def label_and_url_for_value(self, value):
+        if self.group is None or str(self.group.pk) != str(value):
+            return super().label_and_url_for_value(value)
+        url = reverse(f'{self.admin_site.name}:posts_group_change',
+                      args=(self.group.pk,))
+        return Truncator(self.group).words(14), url
+
+
+class PostChangelistForm(forms.ModelForm):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.group_id:
+            self.fields['group'].widget.group = self.instance.group
+
+
+class MoveToGroupForm(forms.Form):
+    group = forms.ModelChoiceField(
+        Group.objects.all(), required=False, label='Группа',
+        help_text='Оставьте пустым, чтобы убрать посты из группы.',
+        widget=GroupIdWidget(Post._meta.get_field('group').remote_field,
+                             admin.site),
+    )
+
+
+def move_to_group(modeladmin, request, queryset):
+    """Действие админки: спрашивает группу и переносит выбранные посты
+    одним UPDATE.
+
+    UPDATE обходит сигналы, поэтому кэш страниц сбрасывается здесь.
+    """
+    form = MoveToGroupForm(request.POST if 'apply' in request.POST else None)
+    if not form.is_valid():
+        template = 'admin/posts/post/move_to_group.html'
+        return TemplateResponse(request, template, {
+            **modeladmin.admin_site.each_context(request),
+            'title': 'Перенести посты в группу',
+            'opts': modeladmin.model._meta,
+            'form': form,
+            'media': modeladmin.media + form.media,
+            'selected': request.POST.getlist(ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+            'action_checkbox_name': ACTION_CHECKBOX_NAME,
+        })
+    group = form.cleaned_data['group']
+    group_id = group.id if group else None
+    posts = queryset.order_by()
+    old_groups = set(posts.values_list('group_id', flat=True).distinct())
+    authors = list(posts.values_list('author_id', flat=True).distinct())
+    updated = posts.update(group=group)
+    generations.bump('index')
+    generations.bump('post_group', group_id)
+    invalidate_groups(old_groups | {group_id})
+    invalidate_authors(User.objects.filter(id__in=authors))
+    modeladmin.message_user(request, f'Обновлено постов: {updated}')
+
+
+move_to_group.short_description = 'Перенести в группу'
 
 
 class PostAdmin(admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     list_editable = ('group', )
+    list_select_related = ('author', 'group')
+    raw_id_fields = ('group', )
+    actions = (move_to_group, )
     search_fields = ('text', )
     list_filter = ('pub_date', )
     empty_value_display = '-пусто-'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search.is_supported() or not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        if search.match_expression(search_term) is None:
+            return queryset.none(), False
+        return search.filter_matching(queryset, search_term), False
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'group':
+            kwargs['widget'] = GroupIdWidget(db_field.remote_field,
+                                             self.admin_site,
+                                             using=kwargs.get('using'))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', PostChangelistForm)
+        return super().get_changelist_form(request, **kwargs)
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -21,6 +121,9 @@ class FollowAdmin(admin.ModelAdmin):
 
 class CommentAdmin(admin.ModelAdmin):
     list_display = ('text', 'post', 'author', 'created')
+    list_select_related = ('post', 'author')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 admin.site.register(Post, PostAdmin)
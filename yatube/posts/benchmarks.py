@@ -0,0 +1,159 @@
+import json
+import os
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Group, Post, UserStats
+
+User = get_user_model()
+
+# Объёмы данных, которые seed_data создаёт для каждого прогона.
+SIZES = {
+    'small': {'users': 100, 'posts': 1000, 'comments': 2000,
+              'follows': 1000},
+    'medium': {'users': 1000, 'posts': 10000, 'comments': 20000,
+               'follows': 10000},
+    'large': {'users': 10000, 'posts': 100000, 'comments': 200000,
+              'follows': 100000},
+}
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, round(share * (len(values) - 1)))]
+
+
+def noise(values):
+    """Разброс замеров: медианное абсолютное отклонение в миллисекундах.
+
+    В отличие от стандартного отклонения не раздувается от единичных
+    выбросов, которые и так видны в p95.
+    """
+    median = statistics.median(values)
+    return statistics.median(abs(value - median) for value in values)
+
+
+def targets():
+    """URL каждой страницы и пользователь, от имени которого она читается.
+
+    Берутся самые тяжёлые объекты: автор с наибольшим числом постов,
+    читатель с наибольшим числом подписок и самый комментируемый пост.
+    """
+    author = UserStats.objects.select_related('user').order_by(
+        '-posts', 'user_id'
+    ).first().user
+    reader = UserStats.objects.select_related('user').order_by(
+        '-following', 'user_id'
+    ).first().user
+    group = Group.objects.order_by('id').first()
+    post = Post.objects.order_by('-comment_count', 'id').first()
+    return {
+        'index': (reverse('posts:index'), None),
+        'group_posts': (reverse('posts:group_list', args=(group.slug,)),
+                        None),
+        'profile': (reverse('posts:profile', args=(author.username,)),
+                    None),
+        'post_detail': (reverse('posts:post_detail', args=(post.id,)),
+                        None),
+        'follow_index': (reverse('posts:follow_index'), reader),
+    }
+
+
+def timed_get(client, url):
+    """Время ответа в миллисекундах и число SQL-запросов.
+
+    Перед запросом кэш очищается, так что меряется полный рендер
+    страницы, а не отдача из cache_page.
+    """
+    cache.clear()
+    with CaptureQueriesContext(connection) as captured:
+        start = time.perf_counter()
+        response = client.get(url)
+        elapsed = (time.perf_counter() - start) * 1000
+    if response.status_code != 200:
+        raise RuntimeError(f'{url} вернул {response.status_code}')
+    return elapsed, len(captured)
+
+
+def run(repeat=None, warmup=None):
+    """p50/p95, разброс времени ответа и число SQL-запросов страниц.
+
+    Первые warmup кругов прогревают шаблоны и импорты и не считаются.
+    Страницы замеряются по кругу, а не подряд: всплеск нагрузки
+    на машине задевает все страницы поровну, а не одну.
+    """
+    repeat = settings.BENCHMARK_REPEAT if repeat is None else repeat
+    warmup = settings.BENCHMARK_WARMUP if warmup is None else warmup
+    clients = {}
+    for name, (url, user) in targets().items():
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        clients[name] = (client, url)
+    timings = {name: [] for name in clients}
+    queries = dict.fromkeys(clients, 0)
+    for round_ in range(warmup + repeat):
+        for name, (client, url) in clients.items():
+            elapsed, count = timed_get(client, url)
+            if round_ < warmup:
+                continue
+            timings[name].append(elapsed)
+            queries[name] = max(queries[name], count)
+    return {name: {'p50': round(percentile(timings[name], 0.5), 2),
+                   'p95': round(percentile(timings[name], 0.95), 2),
+                   'noise': round(noise(timings[name]), 2),
+                   'queries': queries[name]}
+            for name in clients}
+
+
+def compare(results, baselines, threshold):
+    """Список регрессий: любое увеличение числа запросов или рост
+    p50/p95 больше чем на threshold плюс разброс замеров.
+
+    Разброс — больший из записанного в базовой линии и нынешнего,
+    умноженный на BENCHMARK_NOISE_FACTOR: время на шумной машине
+    сравнивается с поправкой на её шум, число запросов — строго.
+    """
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            continue
+        slack = settings.BENCHMARK_NOISE_FACTOR * max(
+            baseline.get('noise', 0), result.get('noise', 0)
+        )
+        for metric in ('p50', 'p95'):
+            limit = baseline[metric] * (1 + threshold) + slack
+            if result[metric] > limit:
+                regressions.append(
+                    f'{name}: {metric} {result[metric]} мс '
+                    f'> {baseline[metric]} мс + {threshold:.0%} '
+                    f'+ {slack:.2f} мс разброса'
+                )
+        if result['queries'] > baseline['queries']:
+            regressions.append(
+                f'{name}: {result["queries"]} запросов '
+                f'> {baseline["queries"]}'
+            )
+    return regressions
+
+
+def load(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as baselines:
+        return json.load(baselines)
+
+
+def save(path, baselines):
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump(baselines, output, indent=2, sort_keys=True)
+        output.write('\n')
@@ -0,0 +1,78 @@
+from functools import wraps
+from hashlib import md5
+
+from django.db.models import OuterRef, Subquery
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import generations
+from .models import Comment, Post
+
+
+def _etag(request, *parts):
+    # Шапка страницы зависит от пользователя, поэтому он входит в ETag.
+    # Кнопки подписки в лентах подгружаются отдельно (см. follow_states).
+    viewer = request.user.pk if request.user.is_authenticated else 'anon'
+    raw = ':'.join(str(part) for part in (viewer, *parts))
+    return md5(raw.encode()).hexdigest()
+
+
+def index_etag(request):
+    return _etag(request, 'index', generations.generation('index'))
+
+
+def group_etag(request, slug):
+    return _etag(request, 'group', generations.generation('group', slug))
+
+
+def profile_etag(request, username):
+    return _etag(request, 'profile',
+                 generations.generation('profile', username))
+
+
+def post_etag(request, post_id):
+    """ETag страницы поста одним запросом: хранимое число и время
+    последнего комментария, число постов автора и поколения поста,
+    автора и группы."""
+    comments = Comment.objects.filter(post=OuterRef('pk')).order_by()
+    row = Post.objects.filter(pk=post_id).annotate(
+        last_comment=Subquery(
+            comments.order_by('-created', '-id').values('created')[:1]
+        ),
+    ).order_by().values_list('author_id', 'group_id',
+                             'author__stats__posts', 'comment_count',
+                             'last_comment').first()
+    if row is None:
+        return None
+    author_id, group_id, *counters = row
+    version = generations.version(
+        ('post', post_id),
+        ('post_author', author_id),
+        ('post_group', group_id),
+    )
+    return _etag(request, 'post', version, *counters)
+
+
+def conditional_page(etag_func):
+    """Отвечает 304 Not Modified, если ETag клиента совпал, не вызывая view.
+
+    Браузер и прокси хранят страницу, но сверяют ETag при каждом
+    обращении: max-age, выставленный cache_page, сбрасывается.
+    Посчитанный ETag доступен view как request.etag.
+    """
+    def remembered(request, *args, **kwargs):
+        request.etag = etag_func(request, *args, **kwargs)
+        return request.etag
+
+    def decorator(view):
+        conditional_view = condition(etag_func=remembered)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            patch_cache_control(response, no_cache=True, max_age=0)
+            if response.has_header('Expires'):
+                del response['Expires']
+            return response
+        return wrapper
+    return decorator
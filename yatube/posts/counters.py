@@ -0,0 +1,75 @@
+from core.queries import unbudgeted
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, UserStats
+
+FIELDS = ('posts', 'followers', 'following', 'comments')
+
+
+def bump(user_id, field, delta):
+    """Атомарно меняет счётчик; отсутствующая строка будет
+    посчитана заново при первом чтении."""
+    stats = UserStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        stats = stats.filter(**{f'{field}__gte': -delta})
+    stats.update(**{field: F(field) + delta})
+
+
+def bump_comments(post_id, delta):
+    """Число комментариев хранится в самом посте: страница поста
+    не считает их при каждом запросе."""
+    posts = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        posts = posts.filter(comment_count__gte=-delta)
+    posts.update(comment_count=F('comment_count') + delta)
+
+
+def recount_comments(post_ids):
+    comments = Comment.objects.filter(post=OuterRef('pk')).order_by().values(
+        'post'
+    ).annotate(count=Count('id')).values('count')
+    Post.objects.filter(id__in=list(post_ids)).update(
+        comment_count=Coalesce(Subquery(comments), 0)
+    )
+
+
+def recount(user_ids):
+    """Пересчитывает счётчики пачки пользователей агрегирующими запросами."""
+    user_ids = list(user_ids)
+    totals = {user_id: dict.fromkeys(FIELDS, 0) for user_id in user_ids}
+    sources = (
+        ('posts', Post.objects, 'author'),
+        ('followers', Follow.objects, 'author'),
+        ('following', Follow.objects, 'user'),
+        ('comments', Comment.objects, 'author'),
+    )
+    for field, manager, key in sources:
+        rows = manager.filter(**{f'{key}__in': user_ids}).order_by().values(
+            key
+        ).annotate(total=Count('id')).values_list(key, 'total')
+        for user_id, total in rows:
+            totals[user_id][field] = total
+    with transaction.atomic():
+        UserStats.objects.filter(user_id__in=user_ids).delete()
+        return UserStats.objects.bulk_create(
+            UserStats(user_id=user_id, **values)
+            for user_id, values in totals.items()
+        )
+
+
+def stats_for(user):
+    return stats_by_id(user.id)
+
+
+def stats_by_id(user_id):
+    try:
+        return UserStats.objects.get(user_id=user_id)
+    except UserStats.DoesNotExist:
+        pass
+    try:
+        with unbudgeted():
+            return recount([user_id])[0]
+    except IntegrityError:
+        return UserStats.objects.get(user_id=user_id)
@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.template.defaultfilters import truncatechars
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from .conditional import (conditional_page, group_etag, index_etag,
+                          profile_etag)
+from .generations import cache_by_generation
+from .models import Group, Post, User
+
+
+class LatestPostsFeed(Feed):
+    title = 'Yatube: последние обновления'
+    description = 'Последние записи на сайте'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+    def items(self, obj):
+        return self.posts(obj).select_related(
+            'author', 'group'
+        )[:settings.FEED_SIZE]
+
+    def item_title(self, item):
+        return truncatechars(item.text, 60)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=(item.id,))
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_categories(self, item):
+        return (item.group.title,) if item.group else ()
+
+
+class GroupFeed(LatestPostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, obj):
+        return f'Yatube: {obj.title}'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('posts:group_list', args=(obj.slug,))
+
+    def posts(self, obj):
+        return obj.posts.all()
+
+
+class ProfileFeed(LatestPostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f'Yatube: {obj.get_full_name() or obj.username}'
+
+    def description(self, obj):
+        return f'Записи пользователя {obj.username}'
+
+    def link(self, obj):
+        return reverse('posts:profile', args=(obj.username,))
+
+    def posts(self, obj):
+        return Post.objects.filter(author=obj)
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class GroupAtomFeed(GroupFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+class ProfileAtomFeed(ProfileFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+def cached_feed(feed, etag_func, scope, kwarg=None):
+    """Лента кэшируется и отвечает 304 так же, как страница той же области."""
+    return conditional_page(etag_func)(cache_by_generation(scope, kwarg)(feed))
+
+
+index_rss = cached_feed(LatestPostsFeed(), index_etag, 'index')
+index_atom = cached_feed(LatestPostsAtomFeed(), index_etag, 'index')
+group_rss = cached_feed(GroupFeed(), group_etag, 'group', 'slug')
+group_atom = cached_feed(GroupAtomFeed(), group_etag, 'group', 'slug')
+profile_rss = cached_feed(ProfileFeed(), profile_etag, 'profile', 'username')
+profile_atom = cached_feed(ProfileAtomFeed(), profile_etag, 'profile',
+                           'username')
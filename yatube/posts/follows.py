@@ -0,0 +1,45 @@
+from core import caches
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Follow
+
+
+def _key(user_id):
+    return f'followees:{user_id}'
+
+
+def followees(user):
+    """Множество id авторов, на которых подписан user.
+
+    Лежит в кэше до первой подписки или отписки (см. forget) и
+    запоминается на объекте пользователя до конца запроса.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    if hasattr(user, '_followees'):
+        return user._followees
+    ids = cache.get(_key(user.id))
+    if ids is None:
+        ids = frozenset(Follow.objects.filter(user_id=user.id).values_list(
+            'author_id', flat=True
+        ))
+        cache.set(_key(user.id), ids,
+                  caches.timeout(settings.FOLLOWEES_CACHE_TIMEOUT))
+    user._followees = ids
+    return ids
+
+
+def is_following(user, author):
+    return author.id in followees(user)
+
+
+def states(user, author_ids):
+    """Подписан ли user на каждого из авторов: {id: bool} по кэшу
+    подписок, без запросов к базе при попадании."""
+    ids = followees(user)
+    return {author_id: author_id in ids for author_id in author_ids}
+
+
+def forget(user_id):
+    cache.delete(_key(user_id))
@@ -1,5 +1,7 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 
+from .images import ingest
 from .models import Comment, Post
 
 
@@ -8,6 +10,18 @@ class PostForm(ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if not isinstance(image, UploadedFile):
+            if not image:
+                self.instance.image_width = None
+                self.instance.image_height = None
+            return image
+        image, width, height = ingest(image)
+        self.instance.image_width = width
+        self.instance.image_height = height
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
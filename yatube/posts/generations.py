@@ -0,0 +1,78 @@
+import time
+from functools import wraps
+
+from core import caches
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.views.decorators.cache import cache_page
+
+
+def _key(scope, value=None):
+    if value is None:
+        return f'generation:{scope}'
+    return f'generation:{scope}:{value}'
+
+
+def generation(scope, value=None):
+    """Текущее поколение области кэша.
+
+    Пропавший из кэша счётчик начинается с текущего времени, а не с единицы,
+    чтобы не совпасть с поколением, под которым ещё лежат старые страницы.
+    В общем кэше счётчик бессрочный; в LocMemCache он истекает, и чужой
+    bump() доходит до процесса не позже LOCAL_CACHE_TIMEOUT.
+    """
+    key = _key(scope, value)
+    current = cache.get(key)
+    if current is None:
+        current = time.time_ns()
+        if not cache.add(key, current, caches.timeout(None)):
+            current = cache.get(key, current)
+    return current
+
+
+def version(*scopes):
+    """Общая версия нескольких областей одним обращением к кэшу.
+
+    Области передаются парами (scope, value).
+    """
+    keys = [_key(scope, value) for scope, value in scopes]
+    current = cache.get_many(keys)
+    for (scope, value), key in zip(scopes, keys):
+        if key not in current:
+            current[key] = generation(scope, value)
+    return '.'.join(str(current[key]) for key in keys)
+
+
+def bump(scope, value=None):
+    key = _key(scope, value)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), caches.timeout(None))
+
+
+def cache_by_generation(scope, kwarg=None):
+    """cache_page, ключ которого включает поколение области `scope`.
+
+    Страница живёт PAGE_CACHE_TIMEOUT секунд (с LocMemCache — не
+    дольше LOCAL_CACHE_TIMEOUT, см. core.caches) или до первой записи,
+    которая увеличит поколение через bump(). Браузеру max-age этого
+    срока не передаётся: он не узнал бы о смене поколения.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            value = kwargs.get(kwarg) if kwarg else None
+            prefix = f'{_key(scope, value)}:{generation(scope, value)}'
+            cached_view = cache_page(
+                caches.timeout(settings.PAGE_CACHE_TIMEOUT),
+                key_prefix=prefix,
+            )(view)
+            response = cached_view(request, *args, **kwargs)
+            patch_cache_control(response, max_age=0)
+            if response.has_header('Expires'):
+                del response['Expires']
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,105 @@
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+from sorl.thumbnail import delete
+from sorl.thumbnail.images import ImageFile
+
+from . import storage, thumbnails
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+
+def ingest(upload):
+    """Готовит загруженную картинку к хранению.
+
+    Размеры проверяются по заголовку до декодирования, затем картинка
+    уменьшается до IMAGE_MAX_SIDE, поворачивается по EXIF и
+    перекодируется в IMAGE_FORMAT без метаданных.
+    Возвращает (ContentFile, ширина, высота).
+    """
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError('Не удалось прочитать изображение.')
+    width, height = image.size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            f'Изображение {width}×{height} слишком большое.'
+        )
+    side = settings.IMAGE_MAX_SIDE
+    # Для JPEG декодер сразу уменьшает картинку в 2–8 раз,
+    # не разворачивая в памяти полный размер.
+    image.draft('RGB', (side, side))
+    try:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((side, side), Image.LANCZOS)
+        image = flatten(image, settings.IMAGE_FORMAT)
+    except OSError:
+        raise ValidationError('Не удалось прочитать изображение.')
+    output = BytesIO()
+    image_format = settings.IMAGE_FORMAT
+    image.save(output, image_format, quality=settings.IMAGE_QUALITY,
+               optimize=True)
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    name = f'{stem}.{EXTENSIONS[image_format]}'
+    width, height = image.size
+    return ContentFile(output.getvalue(), name=name), width, height
+
+
+def flatten(image, image_format):
+    """Прозрачность заливается белым: JPEG её не поддерживает."""
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        if image_format != 'JPEG':
+            return image
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def release(name):
+    """Удаляет файл картинки и его миниатюры, если на него больше
+    не ссылается ни один пост.
+
+    Проверка идёт после коммита под блокировкой строки файла в базе
+    (storage.lock), которую берёт и ContentAddressedStorage.save.
+    Загрузка того же содержимого, ещё не закоммиченная, держит заявку
+    на файл или саму блокировку, и файл остаётся. Без блокировки файл
+    не удаляется. Если загрузка откатится, файл останется на диске
+    без ссылок, пока его не освободит следующий release.
+    """
+    transaction.on_commit(lambda: _release(name))
+
+
+def attached(name):
+    """Снимает заявку на файл после коммита поста, который на него
+    ссылается."""
+    transaction.on_commit(lambda: storage.unclaim(name))
+
+
+def _release(name):
+    file_storage = Post.image.field.storage
+    try:
+        with transaction.atomic():
+            storage.lock(name)
+            if (storage.is_claimed(name)
+                    or Post.objects.filter(image=name).exists()):
+                return
+            delete(ImageFile(name, file_storage), delete_file=False)
+            file_storage.delete(name)
+            storage.forget(name)
+    except Exception:
+        logger.exception('Не удалось удалить картинку %s', name)
+        return
+    thumbnails.forget(name)
@@ -0,0 +1,85 @@
+import json
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Порядок важен: при импорте объекты, на которые ссылаются внешние ключи,
+# должны оказаться в базе раньше ссылающихся на них.
+MODELS = {
+    'user': User,
+    'group': Group,
+    'post': Post,
+    'comment': Comment,
+    'follow': Follow,
+}
+USER_FIELDS = ('id', 'password', 'last_login', 'is_superuser', 'username',
+               'first_name', 'last_name', 'email', 'is_staff', 'is_active',
+               'date_joined')
+
+
+def fields(model):
+    if model is User:
+        return USER_FIELDS
+    return tuple(field.attname for field in model._meta.concrete_fields)
+
+
+@contextmanager
+def manual_dates(*fields):
+    """Отключает auto_now_add, чтобы bulk_create сохранил заданные даты."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def auto_dates(model):
+    return [field for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now_add', False)]
+
+
+def _encode(value):
+    # DjangoJSONEncoder обрезает время до миллисекунд.
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} не сериализуется')
+
+
+def dump(name, row):
+    return json.dumps({'model': name, **row}, default=_encode,
+                      ensure_ascii=False)
+
+
+def export_rows(name, offset=0, chunk_size=2000):
+    """Строки JSONL одной модели в порядке pk, начиная с offset-й."""
+    model = MODELS[name]
+    rows = model.objects.order_by('pk').values(*fields(model))[offset:]
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield dump(name, row)
+
+
+def import_batch(name, rows):
+    """Записывает пачку объектов одной модели одним bulk_create
+    и возвращает число пропущенных строк.
+
+    Строки, конфликтующие с уже существующими (тот же pk или другой
+    уникальный ключ), пропускаются, поэтому пачку можно повторить после
+    сбоя. bulk_create их не сообщает, так что пропуски считаются по pk
+    пачки до и после вставки.
+    """
+    model = MODELS[name]
+    ids = [row['id'] for row in rows]
+    stored = model.objects.filter(pk__in=ids)
+    with manual_dates(*auto_dates(model)), transaction.atomic():
+        before = stored.count()
+        model.objects.bulk_create((model(**row) for row in rows),
+                                  ignore_conflicts=True)
+        return len(rows) - (stored.count() - before)
@@ -0,0 +1,70 @@
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from posts import benchmarks
+
+
+class Command(BaseCommand):
+    help = ('Замеряет index, group_posts, profile, post_detail и '
+            'follow_index на заполненной базе и сравнивает с базовой линией')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', default=['small'],
+                            choices=sorted(benchmarks.SIZES))
+        parser.add_argument('--repeat', type=int,
+                            default=settings.BENCHMARK_REPEAT)
+        parser.add_argument('--warmup', type=int,
+                            default=settings.BENCHMARK_WARMUP,
+                            help='Сколько первых кругов не считать.')
+        parser.add_argument('--threshold', type=float,
+                            default=settings.BENCHMARK_THRESHOLD,
+                            help='Допустимый рост p50/p95, доля от базы.')
+        parser.add_argument('--baselines',
+                            default=settings.BENCHMARK_BASELINES)
+        parser.add_argument('--update', action='store_true',
+                            help='Записать результаты как базовую линию.')
+
+    def handle(self, *args, **options):
+        baselines = benchmarks.load(options['baselines'])
+        regressions = []
+        for size in options['sizes']:
+            results = self.run_size(size, options['repeat'],
+                                    options['warmup'])
+            for name, result in results.items():
+                self.stdout.write(
+                    f'{size:<7}{name:<14}p50 {result["p50"]:>8} мс  '
+                    f'p95 {result["p95"]:>8} мс  '
+                    f'±{result["noise"]:>6} мс  '
+                    f'{result["queries"]} запросов'
+                )
+            if options['update']:
+                baselines[size] = results
+            else:
+                regressions += [
+                    f'{size} {line}' for line in benchmarks.compare(
+                        results, baselines.get(size, {}),
+                        options['threshold'],
+                    )
+                ]
+        if options['update']:
+            benchmarks.save(options['baselines'], baselines)
+            self.stdout.write(f'Базовая линия записана в '
+                              f'{options["baselines"]}')
+        if regressions:
+            raise CommandError('Регрессии:\n' + '\n'.join(regressions))
+
+    def run_size(self, size, repeat, warmup):
+        # Каждый объём замеряется на отдельной тестовой базе,
+        # рабочая база не затрагивается.
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            call_command('seed_data', seed=1, stdout=StringIO(),
+                         **benchmarks.SIZES[size])
+            return benchmarks.run(repeat, warmup)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
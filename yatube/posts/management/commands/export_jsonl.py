@@ -0,0 +1,42 @@
+import sys
+
+from django.core.management.base import BaseCommand
+from posts import jsonl
+
+
+class Command(BaseCommand):
+    help = ('Выгружает пользователей, группы, посты, комментарии и '
+            'подписки в JSON Lines потоком, не держа таблицы в памяти')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл для выгрузки, - для stdout.')
+        parser.add_argument('--models', nargs='+', default=list(jsonl.MODELS),
+                            choices=list(jsonl.MODELS))
+        parser.add_argument('--offset', type=int, default=0,
+                            help='Пропустить столько строк и дописать '
+                                 'остальные в конец файла.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        offset = options['offset']
+        if options['path'] == '-':
+            return self.export(sys.stdout, options, offset)
+        mode = 'a' if offset else 'w'
+        with open(options['path'], mode, encoding='utf-8') as output:
+            self.export(output, options, offset)
+
+    def export(self, output, options, offset):
+        written = 0
+        for name in jsonl.MODELS:
+            if name not in options['models']:
+                continue
+            total = jsonl.MODELS[name].objects.count()
+            if offset >= total:
+                offset -= total
+                continue
+            for line in jsonl.export_rows(name, offset,
+                                          options['chunk_size']):
+                output.write(line + '\n')
+                written += 1
+            offset = 0
+        self.stderr.write(f'Выгружено строк: {written}')
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Нарезает миниатюры для уже загруженных картинок постов'
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').order_by().values_list(
+            'image', flat=True
+        ).distinct()
+        total = 0
+        for name in names.iterator():
+            try:
+                thumbnails.generate(name)
+            except Exception as error:
+                self.stderr.write(f'{name}: {error}')
+                continue
+            total += 1
+        self.stdout.write(f'Миниатюры готовы для {total} картинок')
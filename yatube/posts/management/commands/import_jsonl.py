@@ -0,0 +1,107 @@
+import json
+import sys
+from itertools import islice
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from posts import generations, jsonl
+from posts.models import User
+from posts.signals import invalidate_authors, invalidate_groups
+
+# Сколько id за раз уходит в IN при сбросе кэша.
+INVALIDATE_CHUNK = 500
+
+
+def slices(ids, size=INVALIDATE_CHUNK):
+    ids = list(ids)
+    return (ids[start:start + size] for start in range(0, len(ids), size))
+
+
+class Command(BaseCommand):
+    help = ('Загружает JSON Lines, выгруженный export_jsonl, пачками '
+            'bulk_create и пересобирает счётчики и ленты')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл для загрузки, - для stdin.')
+        parser.add_argument('--offset', type=int, default=0,
+                            help='Пропустить столько строк, например '
+                                 'уже загруженных до сбоя.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--no-rebuild', action='store_true',
+                            help='Не пересчитывать счётчики и ленты.')
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            loaded = self.load(sys.stdin, options)
+        else:
+            with open(options['path'], encoding='utf-8') as source:
+                loaded = self.load(source, options)
+        self.stdout.write(f'Загружено строк: {loaded}')
+        if self.skipped:
+            self.stdout.write(f'Пропущено строк, уже бывших в базе или '
+                              f'конфликтующих с ней: {self.skipped}')
+        if not options['no_rebuild']:
+            call_command('recount_stats', stdout=self.stdout)
+            call_command('rebuild_timelines', stdout=self.stdout)
+
+    def load(self, source, options):
+        self.skipped = 0
+        position = options['offset']
+        batch, batch_name, batch_start = [], None, position
+        for line in islice(source, position, None):
+            position += 1
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+                name = row.pop('model')
+                if name not in jsonl.MODELS:
+                    raise KeyError(name)
+            except (ValueError, KeyError) as error:
+                raise CommandError(f'Строка {position}: {error!r}')
+            if batch and (name != batch_name
+                          or len(batch) >= options['chunk_size']):
+                self.flush(batch_name, batch, batch_start)
+                batch, batch_start = [], position - 1
+            batch.append(row)
+            batch_name = name
+        if batch:
+            self.flush(batch_name, batch, batch_start)
+        return position - options['offset']
+
+    def invalidate(self, name, batch):
+        """Сбрасывает страницы, которые затрагивает записанная пачка:
+        bulk_create не посылает сигналов, сбрасывающих кэш.
+
+        Id собираются только из пачки и передаются в IN частями,
+        так что память и число параметров запроса не растут с файлом.
+        """
+        groups, authors, posts = set(), set(), set()
+        for row in batch:
+            if name == 'group':
+                groups.add(row['id'])
+            elif name == 'user':
+                authors.add(row['id'])
+            elif name == 'post':
+                groups.add(row['group_id'])
+                authors.add(row['author_id'])
+            elif name == 'comment':
+                posts.add(row['post_id'])
+                authors.add(row['author_id'])
+        generations.bump('index')
+        for ids in slices(groups):
+            invalidate_groups(ids)
+        for ids in slices(authors):
+            invalidate_authors(User.objects.filter(id__in=ids))
+        for post_id in posts:
+            generations.bump('post', post_id)
+
+    def flush(self, name, batch, start):
+        try:
+            self.skipped += jsonl.import_batch(name, batch)
+        except Exception as error:
+            raise CommandError(
+                f'Не удалось загрузить пачку {name}: {error}. '
+                f'Продолжить можно с --offset {start}'
+            )
+        self.invalidate(name, batch)
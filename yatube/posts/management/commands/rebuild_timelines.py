@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from posts import timeline
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        popular = timeline.popular_authors()
+        user_ids = User.objects.order_by('id').values_list('id', flat=True)
+        last_id, total = 0, 0
+        while True:
+            chunk = list(user_ids.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            timeline.rebuild(chunk, popular)
+            last_id = chunk[-1]
+            total += len(chunk)
+        self.stdout.write(f'Пересобраны ленты {total} пользователей')
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from posts import recommendations
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рекомендации авторов по подпискам: кого читают '
+            'те, кого читает пользователь')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--top', type=int, default=20,
+                            help='Сколько авторов хранить на пользователя')
+        parser.add_argument(
+            '--days', type=int,
+            default=settings.RECOMMENDATION_ACTIVITY_DAYS,
+            help='За сколько дней посты автора повышают его вес',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        weights = recommendations.activity_weights(options['days'])
+        user_ids = User.objects.order_by('id').values_list('id', flat=True)
+        last_id, users, total = 0, 0, 0
+        while True:
+            chunk = list(user_ids.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            total += recommendations.rebuild(chunk, weights, options['top'])
+            last_id = chunk[-1]
+            users += len(chunk)
+        self.stdout.write(
+            f'Посчитано {total} рекомендаций для {users} пользователей'
+        )
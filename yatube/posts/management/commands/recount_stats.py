@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from posts import counters
+from posts.models import Post
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики постов, подписок и комментариев '
+            'пользователей и число комментариев постов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        users = self.in_chunks(User.objects, counters.recount, chunk_size)
+        posts = self.in_chunks(Post.objects, counters.recount_comments,
+                               chunk_size)
+        self.stdout.write(f'Пересчитаны счётчики {users} пользователей '
+                          f'и {posts} постов')
+
+    def in_chunks(self, manager, recount, chunk_size):
+        ids = manager.order_by('id').values_list('id', flat=True)
+        last_id, total = 0, 0
+        while True:
+            chunk = list(ids.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            recount(chunk)
+            last_id = chunk[-1]
+            total += len(chunk)
+        return total
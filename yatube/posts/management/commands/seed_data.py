@@ -0,0 +1,236 @@
+import io
+import random
+from bisect import bisect
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+from posts.jsonl import manual_dates
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+TEXT_POOL = 1000
+
+
+class PowerLaw:
+    """Выбор id с вероятностью, убывающей как 1 / rank ** alpha."""
+
+    def __init__(self, ids, alpha):
+        self.ids = ids
+        self.weights = list(accumulate(
+            1 / rank ** alpha for rank in range(1, len(ids) + 1)
+        ))
+
+    def choice(self):
+        point = random.random() * self.weights[-1]
+        return self.ids[bisect(self.weights, point)]
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, группами, '
+            'постами, комментариями и подписками для нагрузочных тестов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=10000,
+                            help='Число подписок (граф со степенным '
+                                 'распределением подписчиков).')
+        parser.add_argument('--images', type=int, default=0,
+                            help='Сколько постов получат картинку.')
+        parser.add_argument('--alpha', type=float, default=1.2,
+                            help='Показатель степенного распределения.')
+        parser.add_argument('--days', type=int, default=365,
+                            help='На сколько дней назад растянуть даты.')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--no-timelines', action='store_true',
+                            help='Не заполнять материализованные ленты.')
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        self.faker = Faker('ru_RU')
+        self.faker.seed_instance(options['seed'])
+        self.chunk_size = options['chunk_size']
+        self.texts = [self.faker.paragraph() for _ in range(TEXT_POOL)]
+        self.now = timezone.now()
+        self.span = timedelta(days=options['days']).total_seconds()
+
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь')
+        user_ids = self.create_users(options['users'])
+        group_ids = self.create_groups(options['groups'])
+        popular = PowerLaw(user_ids, options['alpha'])
+        # Активность авторов ранжируется независимо от числа подписчиков,
+        # иначе самые читаемые авторы пишут больше всех и ленты раздуваются.
+        active = PowerLaw(random.sample(user_ids, len(user_ids)),
+                          options['alpha'])
+        self.create_follows(options['follows'], user_ids, popular)
+        with manual_dates(Post._meta.get_field('pub_date'),
+                          Comment._meta.get_field('created')):
+            post_ids = self.create_posts(
+                options['posts'], options['images'], active, group_ids
+            )
+            self.create_comments(options['comments'], post_ids, user_ids)
+        self.reset_sequences(User, Group, Post)
+        call_command('recount_stats', chunk_size=self.chunk_size,
+                     stdout=self.stdout)
+        if not options['no_timelines']:
+            call_command('rebuild_timelines', stdout=self.stdout)
+
+    def chunks(self, total):
+        for start in range(0, total, self.chunk_size):
+            yield start, min(self.chunk_size, total - start)
+
+    def next_id(self, model):
+        last = model.objects.order_by('-id').values_list('id', flat=True)
+        return (last.first() or 0) + 1
+
+    @staticmethod
+    def reset_sequences(*models):
+        """Сдвигает последовательности id за явно вставленные ключи,
+        как это делает loaddata: иначе в PostgreSQL следующая обычная
+        вставка получит уже занятый id."""
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def random_date(self):
+        return self.now - timedelta(seconds=random.random() * self.span)
+
+    def create_users(self, total):
+        first_id = self.next_id(User)
+        password = make_password(None)
+        for start, size in self.chunks(total):
+            with transaction.atomic():
+                User.objects.bulk_create(
+                    User(id=first_id + start + i,
+                         username=f'user{first_id + start + i}',
+                         first_name=self.faker.first_name(),
+                         last_name=self.faker.last_name(),
+                         password=password)
+                    for i in range(size)
+                )
+        self.stdout.write(f'Пользователей: {total}')
+        ids = list(range(first_id, first_id + total))
+        random.shuffle(ids)
+        return ids
+
+    def create_groups(self, total):
+        first_id = self.next_id(Group)
+        Group.objects.bulk_create(
+            Group(id=first_id + i,
+                  title=self.faker.catch_phrase(),
+                  slug=f'group-{first_id + i}',
+                  description=random.choice(self.texts))
+            for i in range(total)
+        )
+        self.stdout.write(f'Групп: {total}')
+        return list(range(first_id, first_id + total))
+
+    def create_follows(self, total, user_ids, popular):
+        """Подписки раздаются пользователям поровну (остаток — случайным),
+        авторы каждого пользователя выбираются без повторов."""
+        total = min(total, len(user_ids) * (len(user_ids) - 1))
+        base, rest = divmod(total, len(user_ids))
+        lucky = set(random.sample(user_ids, rest))
+        pairs = []
+        for user_id in user_ids:
+            size = base + (user_id in lucky)
+            pairs += ((user_id, author_id) for author_id
+                      in self.sample_authors(user_id, size, user_ids,
+                                             popular))
+            if len(pairs) >= self.chunk_size:
+                self.save_follows(pairs)
+                pairs = []
+        self.save_follows(pairs)
+        self.stdout.write(f'Подписок: {total}')
+
+    @staticmethod
+    def sample_authors(user_id, size, user_ids, popular):
+        """size разных авторов кроме самого пользователя.
+
+        Сначала по степенному закону, а если популярные авторы
+        исчерпаны за разумное число попыток — добор равномерно из
+        оставшихся, так что цикл всегда конечен.
+        """
+        chosen = set()
+        for _ in range(4 * size):
+            if len(chosen) == size:
+                return chosen
+            author_id = popular.choice()
+            if author_id != user_id:
+                chosen.add(author_id)
+        rest = [author_id for author_id in user_ids
+                if author_id != user_id and author_id not in chosen]
+        return chosen.union(random.sample(rest, size - len(chosen)))
+
+    def save_follows(self, pairs):
+        with transaction.atomic():
+            Follow.objects.bulk_create(
+                Follow(user_id=user_id, author_id=author_id)
+                for user_id, author_id in pairs
+            )
+
+    def create_images(self, total):
+        names = []
+        for i in range(min(total, 10)):
+            buffer = io.BytesIO()
+            color = tuple(random.randrange(256) for _ in range(3))
+            Image.new('RGB', (1200, 800), color).save(buffer, 'JPEG')
+            names.append(default_storage.save(
+                f'posts/seed-{i}.jpg', ContentFile(buffer.getvalue())
+            ))
+        return names
+
+    def create_posts(self, total, images, authors, group_ids):
+        first_id = self.next_id(Post)
+        image_names = self.create_images(images)
+        for start, size in self.chunks(total):
+            posts = []
+            for i in range(size):
+                number = start + i
+                posts.append(Post(
+                    id=first_id + number,
+                    text=random.choice(self.texts),
+                    author_id=authors.choice(),
+                    group_id=(random.choice(group_ids)
+                              if group_ids and random.random() < 0.7
+                              else None),
+                    image=(image_names[number % len(image_names)]
+                           if number < images else ''),
+                    pub_date=self.random_date(),
+                ))
+            with transaction.atomic():
+                Post.objects.bulk_create(posts)
+        self.stdout.write(f'Постов: {total}')
+        return first_id, first_id + total
+
+    def create_comments(self, total, post_ids, user_ids):
+        first_post, last_post = post_ids
+        if first_post == last_post:
+            return
+        for start, size in self.chunks(total):
+            with transaction.atomic():
+                Comment.objects.bulk_create(
+                    Comment(post_id=random.randrange(first_post, last_post),
+                            author_id=random.choice(user_ids),
+                            text=random.choice(self.texts),
+                            created=self.random_date())
+                    for _ in range(size)
+                )
+        self.stdout.write(f'Комментариев: {total}')
@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -31,14 +33,35 @@ class Post(models.Model):
                               )
     image = models.ImageField('Картинка',
                               upload_to='posts/',
-                              blank=True
+                              storage=ContentAddressedStorage(),
+                              blank=True,
+                              db_index=True
                               )
+    image_width = models.PositiveIntegerField(null=True,
+                                              blank=True,
+                                              editable=False
+                                              )
+    image_height = models.PositiveIntegerField(null=True,
+                                               blank=True,
+                                               editable=False
+                                               )
+    comment_count = models.PositiveIntegerField(default=0,
+                                                editable=False
+                                                )
 
     def __str__(self):
         return self.text[:15]
 
     class Meta:
         ordering = ['-pub_date', 'author']
+        indexes = [
+            models.Index(fields=['-pub_date', 'author'],
+                         name='post_feed_idx'),
+            models.Index(fields=['group', '-pub_date', 'author'],
+                         name='post_group_feed_idx'),
+            models.Index(fields=['author', '-pub_date'],
+                         name='post_author_feed_idx'),
+        ]
         default_related_name = 'posts'
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
@@ -60,6 +83,12 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created', 'author', 'post']
+        indexes = [
+            models.Index(fields=['post', '-created', '-id'],
+                         name='comment_post_cursor_idx'),
+            models.Index(fields=['-created', 'author', 'post'],
+                         name='comment_feed_idx'),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -76,5 +105,95 @@ class Follow(models.Model):
 
     class Meta:
         ordering = ['user']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='unique_follow'),
+        ]
         verbose_name = 'Подписку'
         verbose_name_plural = 'Подписки'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(User,
+                             on_delete=models.CASCADE,
+                             related_name='timeline'
+                             )
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='timeline'
+                             )
+    author = models.ForeignKey(User,
+                               on_delete=models.CASCADE,
+                               related_name='+'
+                               )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-pub_date', '-post']
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_feed_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='timeline_author_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_timeline_post'),
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(User,
+                                on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name='stats'
+                                )
+    posts = models.PositiveIntegerField(default=0)
+    followers = models.PositiveIntegerField(default=0)
+    following = models.PositiveIntegerField(default=0)
+    comments = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+
+class Recommendation(models.Model):
+    user = models.ForeignKey(User,
+                             on_delete=models.CASCADE,
+                             related_name='recommendations'
+                             )
+    author = models.ForeignKey(User,
+                               on_delete=models.CASCADE,
+                               related_name='+'
+                               )
+    score = models.FloatField()
+    common = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ['-score', 'author']
+        indexes = [
+            models.Index(fields=['user', '-score', 'author'],
+                         name='recommendation_user_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='unique_recommendation'),
+        ]
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+
+
+class StoredImage(models.Model):
+    """Строка-замок файла картинки: сохранение и удаление одного файла
+    блокируют её в базе, а незакоммиченные загрузки держат на файл
+    заявки, видимые всем процессам."""
+    name = models.CharField(max_length=100, primary_key=True)
+    claims = models.PositiveIntegerField(default=0)
+    claimed = models.DateTimeField(null=True)
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
@@ -0,0 +1,86 @@
+import heapq
+import math
+from datetime import timedelta
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from . import follows
+from .models import Follow, Post, Recommendation
+
+
+def activity_weights(days):
+    """Вес автора: 1 + ln(1 + число его постов за последние days дней).
+
+    Молчащие авторы остаются в рекомендациях, но уступают активным.
+    """
+    since = timezone.now() - timedelta(days=days)
+    rows = Post.objects.filter(pub_date__gte=since).order_by().values(
+        'author'
+    ).annotate(total=Count('id')).values_list('author', 'total')
+    return {author: 1 + math.log1p(total) for author, total in rows}
+
+
+def _candidates(user_ids):
+    """(пользователь, автор, сколько подписок пользователя читают автора)
+    для пачки пользователей одним запросом по индексу подписок.
+
+    Уже прочитанные авторы и сам пользователь отбрасываются. Строки
+    читаются с курсора по мере обхода, упорядоченными по пользователю:
+    в памяти остаются кандидаты одного пользователя, а не всей пачки.
+    """
+    follow = Follow._meta.db_table
+    sql = (f'SELECT mine.user_id, theirs.author_id, COUNT(*) '
+           f'FROM {follow} mine INNER JOIN {follow} theirs '
+           f'ON theirs.user_id = mine.author_id '
+           f'WHERE mine.user_id IN ({", ".join(["%s"] * len(user_ids))}) '
+           f'AND theirs.author_id != mine.user_id '
+           f'AND NOT EXISTS (SELECT 1 FROM {follow} known '
+           f'WHERE known.user_id = mine.user_id '
+           f'AND known.author_id = theirs.author_id) '
+           f'GROUP BY mine.user_id, theirs.author_id '
+           f'ORDER BY mine.user_id')
+    with connection.cursor() as cursor:
+        cursor.execute(sql, user_ids)
+        yield from cursor
+
+
+def rebuild(user_ids, weights, top):
+    """Пересчитывает top лучших авторов для пачки пользователей.
+
+    Кандидаты приходят с курсора, и heapq держит из них только top
+    лучших: память ограничена готовыми рекомендациями пачки.
+    """
+    user_ids = list(user_ids)
+    recommendations = []
+    for user_id, rows in groupby(_candidates(user_ids), key=itemgetter(0)):
+        scored = ((common * weights.get(author_id, 1), author_id, common)
+                  for _, author_id, common in rows)
+        recommendations += [
+            Recommendation(user_id=user_id, author_id=author_id,
+                           score=score, common=common)
+            for score, author_id, common in heapq.nlargest(top, scored)
+        ]
+    with transaction.atomic():
+        Recommendation.objects.filter(user_id__in=user_ids).delete()
+        Recommendation.objects.bulk_create(recommendations)
+    return len(recommendations)
+
+
+def for_user(user):
+    """Рекомендации для виджета одним запросом по индексу
+    (user, -score); авторы, на которых пользователь подписался
+    после пересчёта, отбрасываются по кэшу подписок."""
+    if not user.is_authenticated:
+        return []
+    followed = follows.followees(user)
+    recommendations = Recommendation.objects.filter(
+        user_id=user.id
+    ).select_related('author')
+    return [recommendation for recommendation in recommendations
+            if recommendation.author_id not in followed
+            ][:settings.RECOMMENDATIONS_SIZE]
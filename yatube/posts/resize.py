@@ -0,0 +1,179 @@
+import hashlib
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signing import Signer
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+from PIL import Image, ImageOps
+
+from .images import EXTENSIONS, flatten
+from .models import Post
+from .storage import HASHED_NAME
+
+FORMATS = {extension: image_format
+           for image_format, extension in EXTENSIONS.items()}
+MODES = ('fit', 'crop')
+SIZE_KEY = 'resize-cache-size'
+EVICT_LOCK_KEY = 'resize-cache-evict'
+
+_signer = Signer(salt='posts.resize')
+
+
+def _spec(name, width, height, mode, extension):
+    return f'{width}x{height}/{mode}/{extension}/{name}'
+
+
+def url(name, width, height, mode='crop', extension=None):
+    extension = extension or EXTENSIONS[settings.IMAGE_FORMAT]
+    path = reverse('posts:resize', kwargs={
+        'width': width, 'height': height, 'mode': mode,
+        'extension': extension, 'name': name,
+    })
+    signature = _signer.signature(
+        _spec(name, width, height, mode, extension)
+    )
+    return f'{path}?s={signature}'
+
+
+def verify(signature, name, width, height, mode, extension):
+    return constant_time_compare(
+        signature,
+        _signer.signature(_spec(name, width, height, mode, extension)),
+    )
+
+
+def srcset(name, geometry, mode='crop', extension=None):
+    """Варианты картинки шириной RESIZE_WIDTHS с пропорциями geometry."""
+    width, height = (int(side) for side in geometry.split('x'))
+    return ', '.join(
+        f'{url(name, size, round(height * size / width), mode, extension)} '
+        f'{size}w'
+        for size in settings.RESIZE_WIDTHS
+    )
+
+
+def is_immutable(name):
+    return bool(HASHED_NAME.search(name))
+
+
+def _version(name):
+    """Имя по хэшу само определяет содержимое. Под старым именем файл
+    может смениться, поэтому в ключ варианта входит время изменения
+    исходника: заменённая картинка нарежется заново."""
+    if is_immutable(name):
+        return ''
+    try:
+        return str(os.stat(Post.image.field.storage.path(name)).st_mtime_ns)
+    except (OSError, NotImplementedError):
+        return ''
+
+
+def key(name, width, height, mode, extension):
+    spec = _spec(name, width, height, mode, extension) + _version(name)
+    return hashlib.sha1(spec.encode()).hexdigest()
+
+
+def cache_path(variant_key, extension):
+    return os.path.join(settings.RESIZE_CACHE_ROOT, variant_key[:2],
+                        variant_key[2:4], f'{variant_key}.{extension}')
+
+
+def get(name, width, height, mode, extension):
+    """Путь к готовому варианту на диске; нарезает его при первом запросе.
+
+    Время изменения файла обновляется при каждом обращении: по нему
+    evict выбирает, что удалять первым.
+    """
+    variant_key = key(name, width, height, mode, extension)
+    path = cache_path(variant_key, extension)
+    try:
+        os.utime(path)
+        return path
+    except FileNotFoundError:
+        pass
+    lock = 'resize-lock:' + variant_key
+    if not cache.add(lock, 1, settings.THUMBNAIL_LOCK_TIMEOUT):
+        deadline = time.monotonic() + settings.THUMBNAIL_LOCK_WAIT
+        while cache.get(lock) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        if os.path.exists(path):
+            return path
+    try:
+        size = render(name, width, height, mode, FORMATS[extension], path)
+    finally:
+        cache.delete(lock)
+    _account(size)
+    return path
+
+
+def render(name, width, height, mode, image_format, path):
+    with Post.image.field.storage.open(name) as source:
+        image = Image.open(source)
+        image.draft('RGB', (width, height))
+        image = ImageOps.exif_transpose(image)
+        if mode == 'crop':
+            image = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        else:
+            image.thumbnail((width, height), Image.LANCZOS)
+        image = flatten(image, image_format)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as output:
+            image.save(output, image_format,
+                       quality=settings.IMAGE_QUALITY, optimize=True)
+        os.replace(temporary, path)
+    except Exception:
+        os.remove(temporary)
+        raise
+    return os.path.getsize(path)
+
+
+def _account(size):
+    try:
+        total = cache.incr(SIZE_KEY, size)
+    except ValueError:
+        total = _scan()[1]
+        cache.set(SIZE_KEY, total, None)
+    if total > settings.RESIZE_CACHE_MAX_BYTES and cache.add(
+        EVICT_LOCK_KEY, 1, settings.THUMBNAIL_LOCK_TIMEOUT
+    ):
+        try:
+            evict()
+        finally:
+            cache.delete(EVICT_LOCK_KEY)
+
+
+def _scan():
+    files = []
+    for directory, _, names in os.walk(settings.RESIZE_CACHE_ROOT):
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+    return files, sum(size for _, size, _ in files)
+
+
+def evict():
+    """Удаляет давно не запрошенные варианты, пока кэш не займёт
+    не больше 90% RESIZE_CACHE_MAX_BYTES. Возвращает итоговый размер."""
+    files, total = _scan()
+    target = settings.RESIZE_CACHE_MAX_BYTES * 0.9
+    for _, size, path in sorted(files):
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+    cache.set(SIZE_KEY, total, None)
+    return total
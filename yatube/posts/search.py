@@ -0,0 +1,124 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Post
+
+TABLE = 'posts_post_fts'
+WORDS = re.compile(r'\w+')
+
+# Внешний (content=) индекс FTS5 поверх posts_post: текст не дублируется,
+# а триггеры поддерживают индекс при любой записи, включая bulk_create
+# и QuerySet.update().
+CREATE_TABLE = f'''
+CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(
+    text,
+    content='posts_post',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+)'''
+CREATE_TRIGGERS = (
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {TABLE}_insert AFTER INSERT ON posts_post
+    BEGIN
+        INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text);
+    END''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {TABLE}_delete AFTER DELETE ON posts_post
+    BEGIN
+        INSERT INTO {TABLE}({TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {TABLE}_update
+    AFTER UPDATE OF text ON posts_post
+    BEGIN
+        INSERT INTO {TABLE}({TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text);
+    END''',
+)
+
+
+def is_supported(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def install(using=connection):
+    """Создаёт индекс и триггеры, если их нет."""
+    if not is_supported(using):
+        return
+    with using.cursor() as cursor:
+        cursor.execute(CREATE_TABLE)
+        for sql in CREATE_TRIGGERS:
+            cursor.execute(sql)
+
+
+def restore_triggers(using=connection):
+    """Возвращает триггеры, если индекс уже создан.
+
+    SQLite пересоздаёт таблицу при изменении её полей в миграциях
+    и теряет при этом триггеры, поэтому функция вызывается после migrate.
+    """
+    if not is_supported(using):
+        return
+    if TABLE not in using.introspection.table_names():
+        return
+    with using.cursor() as cursor:
+        for sql in CREATE_TRIGGERS:
+            cursor.execute(sql)
+
+
+def rebuild(using=connection):
+    """Заново индексирует все посты."""
+    with using.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('rebuild')")
+
+
+def match_expression(query):
+    """Запрос пользователя в синтаксисе FTS5: все слова как префиксы.
+
+    Слова берутся в кавычки, поэтому операторы и спецсимволы FTS5
+    из ввода не интерпретируются.
+    """
+    words = WORDS.findall(query or '')
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def filter_matching(posts, query):
+    """Сужает QuerySet постов до подходящих под запрос, без ранжирования."""
+    return posts.extra(
+        where=[f'{Post._meta.db_table}.id IN '
+               f'(SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s)'],
+        params=[match_expression(query)],
+    )
+
+
+def search(query):
+    """Посты, подходящие под запрос, от лучших к худшим.
+
+    Оценка bm25 (отрицательная, чем меньше — тем лучше) делится на
+    1 + возраст поста в днях / SEARCH_RECENCY_DAYS, так что при равной
+    релевантности свежие посты оказываются выше.
+    """
+    posts = Post.objects.select_related('author', 'group')
+    if match_expression(query) is None:
+        return posts.none()
+    if not is_supported():
+        return posts.filter(text__icontains=query).order_by('-pub_date')
+    post_table = Post._meta.db_table
+    return posts.extra(
+        tables=[TABLE],
+        where=[f'{TABLE}.rowid = {post_table}.id', f'{TABLE} MATCH %s'],
+        params=[match_expression(query)],
+        select={'score': (
+            f"bm25({TABLE}) / (1 + (julianday('now') - "
+            f'julianday({post_table}.pub_date)) / %s)'
+        )},
+        select_params=[settings.SEARCH_RECENCY_DAYS],
+        order_by=['score', '-pub_date', '-id'],
+    )
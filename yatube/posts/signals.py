@@ -0,0 +1,171 @@
+from django.db import connections
+from django.db.models.signals import (post_delete, post_migrate, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from . import (counters, follows, generations, images, search, thumbnails,
+               timeline)
+from .models import Comment, Follow, Group, Post, User
+
+PROFILE_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+def invalidate_groups(group_ids):
+    slugs = Group.objects.filter(
+        id__in=[group_id for group_id in group_ids if group_id]
+    ).values_list('slug', flat=True)
+    for slug in slugs:
+        generations.bump('group', slug)
+
+
+def invalidate_authors(authors):
+    for username in authors.values_list('username', flat=True).distinct():
+        generations.bump('profile', username)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    instance._old_group_id, instance._old_image = None, ''
+    # Новый файл ещё не записан: его запишет pre_save поля после сигнала.
+    instance._uploading = (bool(instance.image)
+                           and not instance.image._committed)
+    if instance.pk:
+        instance._old_group_id, instance._old_image = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', 'image').first() or (None, '')
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump(instance.author_id, 'posts', 1)
+        timeline.fan_out(instance)
+    if instance._uploading:
+        images.attached(instance.image.name)
+    if instance.image.name != instance._old_image:
+        if instance._old_image:
+            thumbnails.forget(instance._old_image)
+            images.release(instance._old_image)
+        if instance.image:
+            thumbnails.schedule(instance.image.name)
+    generations.bump('post', instance.id)
+    generations.bump('index')
+    generations.bump('profile', instance.author.username)
+    invalidate_groups({instance.group_id, instance._old_group_id})
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump(instance.author_id, 'posts', -1)
+    if instance.image:
+        images.release(instance.image.name)
+    generations.bump('post', instance.id)
+    generations.bump('index')
+    invalidate_authors(User.objects.filter(id=instance.author_id))
+    invalidate_groups({instance.group_id})
+
+
+@receiver(pre_save, sender=Group)
+def group_saving(sender, instance, **kwargs):
+    instance._old_slug = None
+    if instance.pk:
+        instance._old_slug = Group.objects.filter(
+            pk=instance.pk
+        ).values_list('slug', flat=True).first()
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # После удаления SET_NULL уже отвяжет посты, и авторов группы
+    # будет не найти.
+    instance._authors = list(User.objects.filter(
+        posts__group=instance
+    ).values_list('id', flat=True).distinct())
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    generations.bump('post_group', instance.id)
+    generations.bump('index')
+    generations.bump('group', instance.slug)
+    old_slug = getattr(instance, '_old_slug', None)
+    if old_slug not in (None, instance.slug):
+        generations.bump('group', old_slug)
+    authors = getattr(instance, '_authors', None)
+    if authors is None:
+        authors = User.objects.filter(posts__group=instance)
+    else:
+        authors = User.objects.filter(id__in=authors)
+    invalidate_authors(authors)
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, update_fields=None, **kwargs):
+    instance._old_username = None
+    if instance.pk and update_fields is None:
+        instance._old_username = User.objects.filter(
+            pk=instance.pk
+        ).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields and not PROFILE_FIELDS.intersection(update_fields):
+        return
+    generations.bump('profile', instance.username)
+    if created:
+        return
+    if instance._old_username not in (None, instance.username):
+        generations.bump('profile', instance._old_username)
+    generations.bump('post_author', instance.id)
+    generations.bump('index')
+    invalidate_groups(
+        instance.posts.values_list('group_id', flat=True).distinct()
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump(instance.author_id, 'followers', 1)
+        counters.bump(instance.user_id, 'following', 1)
+        if timeline.followers_changed(instance.author_id, 1):
+            timeline.backfill(instance.user, instance.author)
+    follows.forget(instance.user_id)
+    invalidate_authors(
+        User.objects.filter(id__in=(instance.author_id, instance.user_id))
+    )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump(instance.author_id, 'followers', -1)
+    counters.bump(instance.user_id, 'following', -1)
+    timeline.trim(instance.user, instance.author)
+    timeline.followers_changed(instance.author_id, -1)
+    follows.forget(instance.user_id)
+    invalidate_authors(
+        User.objects.filter(id__in=(instance.author_id, instance.user_id))
+    )
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump(instance.author_id, 'comments', 1)
+        counters.bump_comments(instance.post_id, 1)
+        invalidate_authors(User.objects.filter(id=instance.author_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump(instance.author_id, 'comments', -1)
+    counters.bump_comments(instance.post_id, -1)
+    invalidate_authors(User.objects.filter(id=instance.author_id))
+
+
+@receiver(post_migrate)
+def migrated(sender, using, **kwargs):
+    if sender.name == 'posts':
+        search.restore_triggers(connections[using])
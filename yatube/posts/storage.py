@@ -0,0 +1,106 @@
+import hashlib
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+HASHED_NAME = re.compile(r'(?:^|/)[0-9a-f]{2}/[0-9a-f]{64}\.\w+$')
+
+
+def _stored_images():
+    # models импортирует storage, поэтому модель берётся при вызове.
+    from .models import StoredImage
+    return StoredImage.objects
+
+
+def lock(name):
+    """Блокирует строку файла в базе до конца текущей транзакции.
+
+    Блокировку берёт запись в строку, а не SELECT ... FOR UPDATE:
+    в SQLite только запись ждёт чужой незакоммиченной транзакции.
+    """
+    images = _stored_images()
+    images.get_or_create(name=name)
+    images.filter(name=name).update(claims=F('claims'))
+
+
+def claim(name):
+    """Отмечает, что пост с этим файлом сохраняется, но ещё не закоммичен.
+
+    Запись заявки блокирует строку файла, как lock. Заявку снимает
+    unclaim после коммита поста; заявка, не снятая за
+    IMAGE_CLAIM_TIMEOUT, считается откатившейся.
+    """
+    images = _stored_images()
+    while True:
+        now = timezone.now()
+        if images.filter(name=name).update(claims=F('claims') + 1,
+                                           claimed=now):
+            return
+        try:
+            with transaction.atomic():
+                images.create(name=name, claims=1, claimed=now)
+            return
+        except IntegrityError:
+            # Строку только что создал параллельный запрос.
+            continue
+
+
+def unclaim(name):
+    _stored_images().filter(name=name, claims__gt=0).update(
+        claims=F('claims') - 1
+    )
+
+
+def is_claimed(name):
+    since = timezone.now() - timedelta(seconds=settings.IMAGE_CLAIM_TIMEOUT)
+    return _stored_images().filter(name=name, claims__gt=0,
+                                   claimed__gte=since).exists()
+
+
+def forget(name):
+    _stored_images().filter(name=name).delete()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файл под именем из SHA-256 содержимого.
+
+    Одинаковые загрузки ложатся в один файл posts/ab/<хэш>.<расширение>,
+    поэтому у них общие и миниатюры sorl. Удалять файл можно только
+    когда на него не ссылается ни один пост и нет незакоммиченных
+    загрузок того же содержимого: см. images.release.
+    """
+
+    def save(self, name, content, max_length=None):
+        name = self.hashed_name(name, content)
+        # Ссылка на файл станет видна только после коммита поста,
+        # до тех пор images.release не удалит его по заявке. Заявка
+        # ставится до проверки файла: удаление, начатое раньше, она
+        # дождётся, и файл будет записан заново.
+        claim(name)
+        if self.exists(name):
+            return name
+        saved = super().save(name, content, max_length)
+        if saved != name:
+            # Тот же файл успел записать параллельный запрос.
+            self.delete(saved)
+        return name
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        hexdigest = digest.hexdigest()
+        return os.path.join(
+            directory, hexdigest[:2], hexdigest + extension
+        ).replace('\\', '/')
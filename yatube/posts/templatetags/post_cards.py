@@ -0,0 +1,26 @@
+from django import template
+from posts import generations, resize, thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_card_version(post):
+    return generations.version(
+        ('post', post.id),
+        ('post_author', post.author_id),
+        ('post_group', post.group_id),
+    )
+
+
+@register.simple_tag
+def prefetch_thumbnails(posts):
+    thumbnails.prefetch(posts)
+    return ''
+
+
+@register.simple_tag
+def resized_srcset(image, geometry, mode='crop'):
+    if not image:
+        return ''
+    return resize.srcset(image.name, geometry, mode)
@@ -0,0 +1,143 @@
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from utils.paginator import EstimatedCountPaginator
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class AdminChangelistTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='Admin', email='admin@example.com', password='pass'
+        )
+        cls.groups = [
+            Group.objects.create(title=f'Группа {i}', slug=f'group-{i}',
+                                 description='Описание')
+            for i in range(3)
+        ]
+        cls.authors = [User.objects.create_user(username=f'Author{i}')
+                       for i in range(3)]
+        for i in range(30):
+            post = Post.objects.create(author=cls.authors[i % 3],
+                                       group=cls.groups[i % 3],
+                                       text=f'Пост {i}')
+            Comment.objects.create(post=post, author=cls.authors[i % 3],
+                                   text=f'Коммент {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def changelist_queries(self, url):
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        '''Число запросов списка не зависит от числа строк'''
+        for name in ('admin:posts_post_changelist',
+                     'admin:posts_comment_changelist'):
+            with self.subTest(name=name):
+                url = reverse(name)
+                before = self.changelist_queries(url)
+                for i in range(10):
+                    post = Post.objects.create(author=self.authors[0],
+                                               group=self.groups[1],
+                                               text=f'Ещё пост {i}')
+                    Comment.objects.create(post=post, author=self.admin,
+                                           text='Ещё коммент')
+                self.assertEqual(self.changelist_queries(url), before)
+
+    @override_settings(ESTIMATED_COUNT_LIMIT=5)
+    def test_filtered_count_is_capped(self):
+        '''С фильтром счёт строк останавливается на пороге'''
+        response = self.client.get(reverse('admin:posts_post_changelist'),
+                                   {'q': 'пост'})
+        self.assertEqual(response.context['cl'].result_count, 5)
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertEqual(response.context['cl'].result_count,
+                         Post.objects.order_by('-id').first().id)
+
+    def move_to_group(self, data):
+        return self.client.post(reverse('admin:posts_post_changelist'), {
+            'action': 'move_to_group', **data,
+        })
+
+    def test_move_to_group_action_is_single_update(self):
+        '''Перенос постов в группу спрашивает группу и выполняется
+        одним UPDATE'''
+        target = self.groups[0]
+        group_url = reverse('posts:group_list', args=(target.slug,))
+        self.client.get(group_url)
+        selected = list(Post.objects.exclude(group=target)
+                        .values_list('id', flat=True))
+        response = self.move_to_group({ACTION_CHECKBOX_NAME: selected})
+        self.assertTemplateUsed(response,
+                                'admin/posts/post/move_to_group.html')
+        self.assertEqual(target.posts.count(), 10)
+        with CaptureQueriesContext(connection) as queries:
+            self.move_to_group({ACTION_CHECKBOX_NAME: selected,
+                                'group': target.id, 'apply': 'Перенести'})
+        updates = [query['sql'] for query in queries
+                   if query['sql'].startswith('UPDATE "posts_post"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(target.posts.count(), 30)
+        response = self.client.get(group_url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 30)
+
+    def test_move_to_group_without_group_clears_it(self):
+        '''Пустая группа в форме действия убирает посты из группы'''
+        selected = list(self.groups[1].posts.values_list('id', flat=True))
+        self.move_to_group({ACTION_CHECKBOX_NAME: selected, 'group': '',
+                            'apply': 'Перенести'})
+        self.assertEqual(Post.objects.filter(group=None).count(), 10)
+
+    def test_changelist_group_column_is_raw_id(self):
+        '''Группа в списке редактируется полем id, а не списком групп'''
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertContains(response, 'vForeignKeyRawIdAdminField')
+        self.assertNotContains(response, '<option value="%s"'
+                               % self.groups[2].id)
+        self.assertContains(response, str(self.groups[2]))
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username='Author')
+        posts = [Post.objects.create(author=author, text=f'Пост {i}')
+                 for i in range(30)]
+        Post.objects.filter(id__in=[post.id for post in posts[5:20]]).delete()
+
+    def paginator(self):
+        return EstimatedCountPaginator(Post.objects.order_by('id'), 10)
+
+    def test_short_page_corrects_estimate(self):
+        '''Неполная страница уточняет завышенную по MAX(pk) оценку'''
+        paginator = self.paginator()
+        self.assertGreater(paginator.count, 15)
+        page = paginator.page(2)
+        self.assertEqual(len(page), 5)
+        self.assertFalse(page.has_next())
+        self.assertEqual((paginator.count, paginator.num_pages), (15, 2))
+
+    def test_pages_past_real_end_are_empty(self):
+        '''Номера за реальным концом дают EmptyPage, а не пустой список'''
+        paginator = self.paginator()
+        with self.assertRaises(EmptyPage):
+            paginator.page(3)
+        self.assertEqual(paginator.num_pages, 2)
@@ -0,0 +1,56 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .. import benchmarks
+
+
+class BenchmarkTest(TestCase):
+    def test_run_measures_every_view(self):
+        '''Замер возвращает p50, p95 и число запросов для каждой страницы'''
+        call_command('seed_data', users=20, posts=100, comments=50,
+                     follows=40, seed=1, stdout=StringIO())
+        results = benchmarks.run(repeat=3, warmup=1)
+        self.assertEqual(set(results), {'index', 'group_posts', 'profile',
+                                        'post_detail', 'follow_index'})
+        for name, result in results.items():
+            with self.subTest(name=name):
+                self.assertLessEqual(result['p50'], result['p95'])
+                self.assertGreaterEqual(result['noise'], 0)
+                self.assertGreater(result['queries'], 0)
+
+    def test_compare_reports_regressions(self):
+        '''Рост времени сверх порога и лишние запросы считаются регрессией'''
+        baselines = {'index': {'p50': 10, 'p95': 20, 'queries': 2}}
+        within = {'index': {'p50': 12, 'p95': 24, 'queries': 2}}
+        slower = {'index': {'p50': 13, 'p95': 20, 'queries': 2}}
+        more_queries = {'index': {'p50': 10, 'p95': 20, 'queries': 3}}
+        self.assertEqual(benchmarks.compare(within, baselines, 0.25), [])
+        self.assertEqual(len(benchmarks.compare(slower, baselines, 0.25)), 1)
+        self.assertEqual(
+            len(benchmarks.compare(more_queries, baselines, 0.25)), 1
+        )
+        self.assertEqual(benchmarks.compare(slower, {}, 0.25), [])
+
+    @override_settings(BENCHMARK_NOISE_FACTOR=3)
+    def test_compare_allows_for_noise(self):
+        '''Рост времени в пределах разброса замеров не регрессия,
+        а лишний запрос — регрессия при любом разбросе'''
+        baselines = {'index': {'p50': 10, 'p95': 20, 'noise': 1,
+                               'queries': 2}}
+        noisy = {'index': {'p50': 15, 'p95': 20, 'noise': 0.5,
+                           'queries': 2}}
+        slower = {'index': {'p50': 16, 'p95': 20, 'noise': 0.5,
+                            'queries': 2}}
+        more_queries = {'index': {'p50': 10, 'p95': 20, 'noise': 5,
+                                  'queries': 3}}
+        self.assertEqual(benchmarks.compare(noisy, baselines, 0.25), [])
+        self.assertEqual(len(benchmarks.compare(slower, baselines, 0.25)), 1)
+        self.assertEqual(
+            len(benchmarks.compare(more_queries, baselines, 0.25)), 1
+        )
+
+    def test_noise_ignores_outliers(self):
+        '''Единичный выброс не раздувает разброс'''
+        self.assertEqual(benchmarks.noise([10, 11, 9, 10, 100]), 1)
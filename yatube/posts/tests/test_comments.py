@@ -0,0 +1,97 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(COMMENT_PAGE_SIZE=10)
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        for i in range(25):
+            Comment.objects.create(post=cls.post, author=cls.user,
+                                   text=f'Комментарий {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_post_detail_shows_first_batch(self):
+        '''На странице поста первая пачка комментариев от новых к старым'''
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.id,))
+        )
+        comments = response.context['comments']
+        self.assertEqual([comment.text for comment in comments],
+                         [f'Комментарий {i}' for i in range(24, 14, -1)])
+        self.assertTrue(comments.has_next())
+        self.assertContains(response, 'Комментарии: 25')
+        self.assertContains(response, 'data-fragment=')
+
+    def test_fragment_loads_rest(self):
+        '''Фрагмент «Показать ещё» догружает комментарии до конца'''
+        url = reverse('posts:post_comments', args=(self.post.id,))
+        cursor = self.client.get(
+            reverse('posts:post_detail', args=(self.post.id,))
+        ).context['comments'].next_cursor
+        texts = []
+        while cursor:
+            response = self.client.get(url, {'after': cursor})
+            self.assertTemplateUsed(response, 'includes/comment_list.html')
+            comments = response.context['comments']
+            texts += [comment.text for comment in comments]
+            cursor = comments.next_cursor
+        self.assertEqual(texts,
+                         [f'Комментарий {i}' for i in range(14, -1, -1)])
+        self.assertNotContains(response, 'data-fragment=')
+
+    def test_fragment_of_missing_post_is_404(self):
+        '''Фрагмент комментариев несуществующего поста — 404'''
+        response = self.client.get(reverse('posts:post_comments',
+                                           args=(self.post.id + 1,)))
+        self.assertEqual(response.status_code, 404)
+
+
+class CommentCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+
+    def setUp(self):
+        self.post = Post.objects.create(author=self.user, text='Пост')
+
+    def comment_count(self):
+        return Post.objects.values_list(
+            'comment_count', flat=True
+        ).get(pk=self.post.pk)
+
+    def test_count_follows_comments(self):
+        '''Хранимое число комментариев меняется вместе с ними'''
+        first = Comment.objects.create(post=self.post, author=self.user,
+                                       text='Первый')
+        Comment.objects.create(post=self.post, author=self.user,
+                               text='Второй')
+        self.assertEqual(self.comment_count(), 2)
+        first.delete()
+        self.assertEqual(self.comment_count(), 1)
+
+    def test_recount_after_bulk_import(self):
+        '''recount_stats пересчитывает число комментариев постов'''
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.user, text=f'Импорт {i}')
+            for i in range(3)
+        )
+        self.assertEqual(self.comment_count(), 0)
+        call_command('recount_stats', stdout=StringIO())
+        self.assertEqual(self.comment_count(), 3)
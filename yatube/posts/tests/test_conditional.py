@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def revalidate(self, url, client=None):
+        client = client or self.guest_client
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_return_304(self):
+        '''Неизменившаяся страница отдаётся как 304 без тела'''
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:post_detail', args=(self.post.id,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.revalidate(url)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertIn('no-cache', response['Cache-Control'])
+                self.assertIn('max-age=0', response['Cache-Control'])
+
+    def test_revalidation_costs_at_most_one_query(self):
+        '''Повторный запрос неизменившейся страницы стоит не больше
+        одного запроса к базе'''
+        url = reverse('posts:post_detail', args=(self.post.id,))
+        self.guest_client.get(url)
+        etag = self.guest_client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        url = reverse('posts:group_list', args=(self.group.slug,))
+        etag = self.guest_client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_changes_invalidate_etag(self):
+        '''Новый комментарий и правка поста меняют ETag'''
+        detail = reverse('posts:post_detail', args=(self.post.id,))
+        group = reverse('posts:group_list', args=(self.group.slug,))
+        etags = {url: self.guest_client.get(url)['ETag']
+                 for url in (detail, group)}
+        Comment.objects.create(post=self.post, author=self.user,
+                               text='Коммент')
+        response = self.guest_client.get(
+            detail, HTTP_IF_NONE_MATCH=etags[detail]
+        )
+        self.assertEqual(response.status_code, 200)
+        post = Post.objects.get(id=self.post.id)
+        post.text = 'Исправленный текст'
+        post.save()
+        response = self.guest_client.get(
+            group, HTTP_IF_NONE_MATCH=etags[group]
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Исправленный текст')
+
+    def test_etag_depends_on_viewer(self):
+        '''ETag гостя не подходит авторизованному пользователю'''
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.revalidate(url, self.authorized_client)
+                         .status_code, 304)
@@ -0,0 +1,66 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..counters import stats_for
+from ..models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class UserStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.author = User.objects.create_user(username='Author')
+        Post.objects.create(author=cls.author, text='Тестовый пост')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_counters_follow_writes(self):
+        '''Счётчики меняются при создании и удалении объектов'''
+        self.assertEqual(stats_for(self.author).posts, 1)
+        post = Post.objects.create(author=self.author, text='Второй пост')
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        Comment.objects.create(post=post, author=self.user, text='Коммент')
+        author_stats = stats_for(self.author)
+        user_stats = stats_for(self.user)
+        self.assertEqual(author_stats.posts, 2)
+        self.assertEqual(author_stats.followers, 1)
+        self.assertEqual(user_stats.following, 1)
+        self.assertEqual(user_stats.comments, 1)
+        follow.delete()
+        post.delete()
+        author_stats.refresh_from_db()
+        user_stats.refresh_from_db()
+        self.assertEqual(author_stats.posts, 1)
+        self.assertEqual(author_stats.followers, 0)
+        self.assertEqual(user_stats.following, 0)
+        self.assertEqual(user_stats.comments, 0)
+
+    def test_recount_stats_repairs_drift(self):
+        '''Команда recount_stats исправляет разошедшиеся счётчики'''
+        stats_for(self.author)
+        UserStats.objects.update(posts=42, followers=7)
+        call_command('recount_stats', stdout=StringIO())
+        stats = stats_for(self.author)
+        self.assertEqual(stats.posts, 1)
+        self.assertEqual(stats.followers, 0)
+
+    def test_profile_uses_stored_count(self):
+        '''Профиль и пагинатор не выполняют COUNT(*)'''
+        stats_for(self.author)
+        url = reverse('posts:profile', kwargs={'username': self.author})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(url)
+        self.assertEqual(response.context['post_count'], 1)
+        self.assertEqual(response.context['page_obj'].paginator.count, 1)
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
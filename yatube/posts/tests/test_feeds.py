@@ -0,0 +1,86 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+@override_settings(FEED_SIZE=3)
+class FeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(5):
+            cls.post = Post.objects.create(author=cls.author,
+                                           group=cls.group,
+                                           text=f'Пост номер {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def feed_urls(self):
+        for name, args in (('index', ()),
+                           ('group', (self.group.slug,)),
+                           ('profile', (self.author.username,))):
+            for kind in ('rss', 'atom'):
+                yield kind, reverse(f'posts:{name}_{kind}', args=args)
+
+    def test_feeds_list_latest_posts(self):
+        '''Ленты отдают последние FEED_SIZE постов в своём формате'''
+        for kind, url in self.feed_urls():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(kind, response['Content-Type'])
+                self.assertContains(response, 'Пост номер 4')
+                self.assertContains(response, 'Пост номер 2')
+                self.assertNotContains(response, 'Пост номер 1')
+
+    def test_feeds_support_conditional_get(self):
+        '''Неизменившаяся лента отдаётся как 304, новый пост меняет её'''
+        etags = {}
+        for kind, url in self.feed_urls():
+            with self.subTest(url=url):
+                etags[url] = self.guest_client.get(url)['ETag']
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, 304)
+        Post.objects.create(author=self.author, group=self.group,
+                            text='Свежий пост')
+        for kind, url in self.feed_urls():
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertContains(response, 'Свежий пост')
+
+    def test_pages_link_to_feeds(self):
+        '''Страницы ссылаются на свои ленты'''
+        pages = (
+            (reverse('posts:index'), reverse('posts:index_rss')),
+            (reverse('posts:group_list', args=(self.group.slug,)),
+             reverse('posts:group_atom', args=(self.group.slug,))),
+            (reverse('posts:profile', args=(self.author.username,)),
+             reverse('posts:profile_rss', args=(self.author.username,))),
+        )
+        for page, feed in pages:
+            with self.subTest(page=page):
+                self.assertContains(self.guest_client.get(page), feed)
+
+    def test_unknown_group_feed_is_404(self):
+        '''Лента несуществующей группы отвечает 404'''
+        response = self.guest_client.get(
+            reverse('posts:group_rss', args=('missing',))
+        )
+        self.assertEqual(response.status_code, 404)
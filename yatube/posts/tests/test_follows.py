@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import follows
+from ..models import Follow, Post
+
+User = get_user_model()
+
+
+class FollowStateTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.fan = User.objects.create_user(username='Fan')
+        cls.authors = [User.objects.create_user(username=f'Author{i}')
+                       for i in range(3)]
+        for author in cls.authors:
+            Post.objects.create(author=author, text=f'Пост {author}')
+        Follow.objects.create(user=cls.user, author=cls.authors[0])
+        Follow.objects.create(user=cls.fan, author=cls.authors[1])
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def fresh_user(self):
+        return User(pk=self.user.pk, username=self.user.username)
+
+    def test_followees_in_one_query_then_cached(self):
+        '''Подписки зрителя загружаются одним запросом и берутся из кэша'''
+        with self.assertNumQueries(1):
+            self.assertEqual(follows.followees(self.fresh_user()),
+                             {self.authors[0].id})
+        ids = [author.id for author in self.authors]
+        with self.assertNumQueries(0):
+            states = follows.states(self.fresh_user(), ids)
+        self.assertEqual(states, dict(zip(ids, (True, False, False))))
+
+    def test_profile_shows_viewer_state(self):
+        '''Кнопка в профиле зависит от подписок зрителя, а не от того,
+        подписан ли на автора хоть кто-то'''
+        cases = ((self.authors[0], True), (self.authors[1], False))
+        for author, following in cases:
+            with self.subTest(author=author.username):
+                response = self.authorized_client.get(
+                    reverse('posts:profile', args=(author.username,))
+                )
+                self.assertEqual(response.context['following'], following)
+
+    def states(self, client=None):
+        response = (client or self.authorized_client).get(
+            reverse('posts:follow_states'),
+            {'authors': ','.join(str(author.id) for author in self.authors)
+             + ',x'},
+        )
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return response.json()
+
+    def test_follow_states_follow_and_unfollow(self):
+        '''Состояние кнопок отдаётся отдельно и сразу меняется
+        после подписки и отписки'''
+        author = self.authors[2]
+        key = str(author.id)
+        self.assertEqual(self.states(), {
+            str(self.authors[0].id): True, str(self.authors[1].id): False,
+            key: False,
+        })
+        self.authorized_client.get(reverse('posts:profile_follow',
+                                           args=(author.username,)))
+        self.assertIs(self.states()[key], True)
+        self.authorized_client.get(reverse('posts:profile_unfollow',
+                                           args=(author.username,)))
+        self.assertIs(self.states()[key], False)
+
+    def test_cached_feed_is_shared_by_viewers(self):
+        '''Закэшированная главная не зависит от подписок зрителя:
+        подписка не сбрасывает кэш, а кнопки заполняются скриптом'''
+        url = reverse('posts:index')
+        first = self.authorized_client.get(url)
+        self.assertContains(first,
+                            f'data-follow-author="{self.authors[2].id}"')
+        self.assertContains(first, reverse('posts:follow_states'))
+        self.authorized_client.get(reverse('posts:profile_follow',
+                                           args=(self.authors[2].username,)))
+        second = self.authorized_client.get(url)
+        self.assertIsNone(second.context)
+        self.assertEqual(second.content, first.content)
+
+    def test_guest_sees_no_buttons(self):
+        '''Гостю кнопки подписки в ленте не показываются'''
+        response = Client().get(reverse('posts:index'))
+        self.assertNotContains(response, 'Подписаться на')
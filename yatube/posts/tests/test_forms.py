@@ -68,7 +68,7 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(Post.objects.count(), post_count + 1)
         self.assertTrue(Post.objects.filter(
             text=form_data['text'],
-            image=f'posts/{test_image}').exists()
+            image__regex=r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$').exists()
         )
 
     def test_post_create_form_with_group(self):
@@ -129,4 +129,5 @@ class PostCreateFormTests(TestCase):
         )
         self.assertTrue(Comment.objects.filter(**form_data).exists())
         context_comments = response.context.get('comments')
-        self.assertTrue(context_comments.exists())
+        self.assertEqual([comment.text for comment in context_comments],
+                         [form_data['text']])
@@ -0,0 +1,51 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.test import TestCase
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser',
+                                            first_name='Иван')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Тестовый пост', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def render(self):
+        posts = Post.objects.select_related('author', 'group')
+        return render_to_string('includes/posts.html', {'page_obj': posts})
+
+    def test_card_is_reused_until_post_changes(self):
+        '''Карточка поста берётся из кэша, пока пост не изменится'''
+        self.render()
+        Post.objects.filter(id=self.post.id).update(text='Без сигналов')
+        self.assertIn('Тестовый пост', self.render())
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.assertIn('Новый текст', self.render())
+
+    def test_card_follows_author_and_group_changes(self):
+        '''Карточка сбрасывается при смене имени автора или группы'''
+        self.render()
+        self.user.first_name = 'Пётр'
+        self.user.save()
+        self.group.title = 'Другая группа'
+        self.group.save()
+        html = self.render()
+        self.assertIn('Пётр', html)
+        self.assertIn('Другая группа', html)
@@ -0,0 +1,102 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..forms import PostForm
+from ..models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+ORIENTATION = 0x0112
+
+
+def upload(name='photo.png', size=(100, 50), image_format='PNG',
+           mode='RGB', exif=None):
+    buffer = BytesIO()
+    image = Image.new(mode, size, 'red')
+    options = {'exif': exif} if exif else {}
+    image.save(buffer, image_format, **options)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_MAX_SIDE=40,
+                   IMAGE_MAX_PIXELS=100_000)
+class ImageIngestTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_upload_is_downsized_and_reencoded(self):
+        '''Картинка уменьшается, перекодируется в JPEG и
+        её размеры сохраняются в посте'''
+        self.authorized_client.post(reverse('posts:post_create'), {
+            'text': 'С картинкой',
+            'image': upload('alpha.png', mode='RGBA'),
+        })
+        post = Post.objects.get(text='С картинкой')
+        self.assertRegex(post.image.name,
+                         r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        self.assertEqual((post.image_width, post.image_height), (40, 20))
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.format, 'JPEG')
+            self.assertEqual(stored.size, (40, 20))
+
+    def test_metadata_is_stripped_after_rotation(self):
+        '''EXIF применяется к ориентации и не попадает в файл'''
+        exif = Image.Exif()
+        exif[ORIENTATION] = 6
+        form = PostForm(
+            data={'text': 'Повёрнутая'},
+            files={'image': upload('turned.jpg', (30, 10), 'JPEG',
+                                   exif=exif.tobytes())},
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(
+            (form.instance.image_width, form.instance.image_height),
+            (10, 30),
+        )
+        with Image.open(form.cleaned_data['image']) as stored:
+            self.assertFalse(stored.getexif())
+
+    def test_oversized_image_is_rejected_before_decoding(self):
+        '''Слишком большая по пикселям картинка не принимается'''
+        form = PostForm(
+            data={'text': 'Огромная'},
+            files={'image': upload(size=(1000, 1000))},
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
+    def test_edit_without_new_image_keeps_dimensions(self):
+        '''Правка текста не трогает сохранённую картинку'''
+        self.authorized_client.post(reverse('posts:post_create'), {
+            'text': 'Исходный',
+            'image': upload(),
+        })
+        post = Post.objects.get(text='Исходный')
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=(post.id,)),
+            {'text': 'Исправленный'},
+        )
+        name = post.image.name
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Исправленный')
+        self.assertEqual(post.image.name, name)
+        self.assertEqual((post.image_width, post.image_height), (40, 20))
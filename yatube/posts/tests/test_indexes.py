@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+FEED_TABLES = ('posts_post', 'posts_comment', 'posts_follow')
+
+
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Тестовый пост', group=cls.group
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def query_plans(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(url)
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                yield sql, [row[-1] for row in cursor.fetchall()]
+
+    def test_feed_queries_use_indexes(self):
+        '''Запросы лент не сортируют во временном B-дереве
+        и не сканируют таблицы постов, комментариев и подписок целиком'''
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:follow_index'),
+            reverse('posts:index_rss'),
+            reverse('posts:group_rss', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile_atom', kwargs={'username': self.author}),
+        )
+        for url in urls:
+            for sql, plan in self.query_plans(url):
+                with self.subTest(url=url, sql=sql):
+                    for step in plan:
+                        self.assertNotIn('TEMP B-TREE', step)
+                        if step.startswith('SCAN') and any(
+                            table in step for table in FEED_TABLES
+                        ):
+                            self.assertIn('INDEX', step)
+
+
+class UniqueFollowMigrationTest(TransactionTestCase):
+    before = [('posts', '0009_follow')]
+    after = [('posts', '0010_feed_indexes')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicates_removed_before_constraint(self):
+        '''Миграция с уникальностью подписок удаляет дубли, оставляя
+        самую раннюю подписку пары'''
+        apps = self.migrate(self.before)
+        OldUser = apps.get_model('auth', 'User')
+        OldFollow = apps.get_model('posts', 'Follow')
+        reader = OldUser.objects.create(username='reader')
+        author = OldUser.objects.create(username='author')
+        first = OldFollow.objects.create(user=reader, author=author)
+        OldFollow.objects.create(user=reader, author=author)
+        OldFollow.objects.create(user=author, author=reader)
+        apps = self.migrate(self.after)
+        Follow = apps.get_model('posts', 'Follow')
+        self.assertEqual(
+            Follow.objects.filter(user_id=reader.id).get().id, first.id
+        )
+        self.assertEqual(Follow.objects.count(), 2)
@@ -0,0 +1,123 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..jsonl import import_batch
+from ..models import Comment, Follow, Group, Post, TimelineEntry, UserStats
+
+User = get_user_model()
+
+
+class JsonlTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser',
+                                            first_name='Тест')
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(5):
+            post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text=f'Пост {i}')
+            Comment.objects.create(post=post, author=cls.user,
+                                   text=f'Коммент {i}')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def snapshot(self):
+        return {model: list(model.objects.order_by('pk').values())
+                for model in (User, Group, Post, Comment, Follow)}
+
+    def wipe(self):
+        User.objects.all().delete()
+        Group.objects.all().delete()
+
+    def test_roundtrip(self):
+        '''Выгрузка и загрузка сохраняют объекты и их даты'''
+        before = self.snapshot()
+        call_command('export_jsonl', self.path, stderr=StringIO())
+        self.wipe()
+        call_command('import_jsonl', self.path, stdout=StringIO())
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(UserStats.objects.get(user=self.author).posts, 5)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user).count(), 5
+        )
+
+    def test_resume_from_offset(self):
+        '''Выгрузку и загрузку можно продолжить с заданной строки'''
+        call_command('export_jsonl', self.path, '--models', 'user', 'group',
+                     'post', stderr=StringIO())
+        call_command('export_jsonl', self.path, '--offset', '8',
+                     stderr=StringIO())
+        with open(self.path, encoding='utf-8') as exported:
+            self.assertEqual(len(exported.readlines()), 14)
+        before = self.snapshot()
+        self.wipe()
+        call_command('import_jsonl', self.path, '--chunk-size', '2',
+                     '--no-rebuild', stdout=StringIO())
+        call_command('import_jsonl', self.path, '--offset', '5',
+                     stdout=StringIO())
+        self.assertEqual(self.snapshot(), before)
+
+    def test_reimport_reports_skipped_rows(self):
+        '''Повторная загрузка сообщает, сколько строк пропущено'''
+        call_command('export_jsonl', self.path, stderr=StringIO())
+        out = StringIO()
+        call_command('import_jsonl', self.path, '--no-rebuild', stdout=out)
+        self.assertIn('Пропущено строк, уже бывших в базе или '
+                      'конфликтующих с ней: 14', out.getvalue())
+
+    def test_import_invalidates_cached_pages(self):
+        '''После загрузки главная, группа и профиль показывают новые
+        посты, а не закэшированные страницы'''
+        call_command('export_jsonl', self.path, stderr=StringIO())
+        Post.objects.all().delete()
+        cache.clear()
+        urls = (reverse('posts:index'),
+                reverse('posts:group_list', args=(self.group.slug,)),
+                reverse('posts:profile', args=(self.author.username,)))
+        for url in urls:
+            self.assertNotContains(self.client.get(url), 'Пост 4')
+        call_command('import_jsonl', self.path, stdout=StringIO())
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Пост 4')
+
+    def test_pages_invalidated_per_batch(self):
+        '''Кэш сбрасывается после каждой записанной пачки: id не копятся
+        до конца загрузки, и сбой следующей пачки не оставляет старых
+        страниц'''
+        call_command('export_jsonl', self.path, stderr=StringIO())
+        Post.objects.all().delete()
+        cache.clear()
+        url = reverse('posts:group_list', args=(self.group.slug,))
+        self.assertNotContains(self.client.get(url), 'Пост 4')
+        with mock.patch('posts.jsonl.import_batch',
+                        side_effect=self.fail_on_comments):
+            with self.assertRaises(CommandError):
+                call_command('import_jsonl', self.path, stdout=StringIO())
+        self.assertContains(self.client.get(url), 'Пост 4')
+
+    @staticmethod
+    def fail_on_comments(name, batch):
+        if name == 'comment':
+            raise RuntimeError('сбой')
+        return import_batch(name, batch)
@@ -0,0 +1,116 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from ..models import Post
+from ..thumbnails import SIZES
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, MEDIA_MAX_AGE=600)
+class MediaViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        buffer = BytesIO()
+        Image.new('RGB', (40, 30), 'green').save(buffer, 'PNG')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            image=SimpleUploadedFile('photo.png', buffer.getvalue()),
+        )
+        cls.legacy = default_storage.save('posts/legacy.txt',
+                                          ContentFile(b'0123456789'))
+        cls.legacy_image = default_storage.save('posts/legacy.png',
+                                                ContentFile(buffer.getvalue()))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_cache_headers_depend_on_name(self):
+        '''Файлы с именем по хэшу кэшируются навсегда, остальные — на
+        MEDIA_MAX_AGE'''
+        response = self.client.get(self.post.image.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(b''.join(response.streaming_content),
+                         self.post.image.read())
+        response = self.client.get(settings.MEDIA_URL + self.legacy)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=600')
+
+    def test_only_thumbnails_of_hashed_images_are_immutable(self):
+        '''Миниатюра картинки со старым именем может смениться вместе
+        с картинкой и не кэшируется навсегда'''
+        geometry, options = SIZES[0]
+        cases = ((self.post.image, True),
+                 (ImageFile(self.legacy_image, default_storage), False))
+        for source, immutable in cases:
+            with self.subTest(source=source.name):
+                thumbnail = get_thumbnail(source, geometry, **options)
+                response = self.client.get(thumbnail.url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual('immutable' in response['Cache-Control'],
+                                 immutable)
+
+    def test_conditional_requests(self):
+        '''If-None-Match и If-Modified-Since дают 304'''
+        url = settings.MEDIA_URL + self.legacy
+        response = self.client.get(url)
+        conditions = (
+            {'HTTP_IF_NONE_MATCH': response['ETag']},
+            {'HTTP_IF_MODIFIED_SINCE': response['Last-Modified']},
+        )
+        for headers in conditions:
+            with self.subTest(headers=headers):
+                self.assertEqual(self.client.get(url, **headers).status_code,
+                                 304)
+
+    def test_range(self):
+        '''Range отдаёт часть файла, If-Range со старым ETag — весь'''
+        url = settings.MEDIA_URL + self.legacy
+        response = self.client.get(url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+        response = self.client.get(url, HTTP_RANGE='bytes=-3',
+                                   HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_and_outside_files_are_404(self):
+        '''Несуществующие файлы и пути вне MEDIA_ROOT не отдаются'''
+        for path in ('posts/missing.png', '../manage.py', 'posts'):
+            with self.subTest(path=path):
+                response = self.client.get(settings.MEDIA_URL + path)
+                self.assertEqual(response.status_code, 404)
+
+    def test_offload(self):
+        '''В режиме offload байты отдаёт веб-сервер'''
+        url = settings.MEDIA_URL + self.legacy
+        with override_settings(MEDIA_OFFLOAD='x-accel-redirect'):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/internal/media/posts/legacy.txt')
+        self.assertEqual(response.content, b'')
+        with override_settings(MEDIA_OFFLOAD='x-sendfile'):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Sendfile'],
+                         default_storage.path(self.legacy))
+        self.assertIn('ETag', response)
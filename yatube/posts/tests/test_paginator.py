@@ -0,0 +1,115 @@
+import base64
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from utils.paginator import (CursorPage, CursorPaginator, decode_cursor,
+                             page_window)
+
+from ..models import Post
+
+User = get_user_model()
+
+
+@override_settings(PAGINATION_MODE='cursor')
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text='Test %s' % i) for i in range(14)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.url = reverse('posts:profile', kwargs={'username': self.user})
+
+    def test_cursor_pages_walk_feed(self):
+        '''Курсорная пагинация отдаёт ленту целиком без пропусков'''
+        expected = list(Post.objects.order_by('-pub_date', '-id'))
+        first = self.client.get(self.url).context['page_obj']
+        self.assertIsInstance(first, CursorPage)
+        self.assertEqual(list(first), expected[:10])
+        self.assertFalse(first.has_previous())
+        self.assertTrue(first.has_next())
+        second = self.client.get(
+            self.url, {'after': first.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(second), expected[10:])
+        self.assertFalse(second.has_next())
+        back = self.client.get(
+            self.url, {'before': second.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back), expected[:10])
+        self.assertFalse(back.has_previous())
+
+    def test_cursor_page_does_not_count(self):
+        '''Курсорная страница не выполняет COUNT(*) и OFFSET'''
+        index = reverse('posts:index')
+        token = self.client.get(index).context['page_obj'].next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(index, {'after': token})
+        self.assertContains(response, '?before=')
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+            self.assertNotIn('OFFSET', query['sql'])
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        '''Испорченный токен открывает первую страницу'''
+        self.assertIsNone(decode_cursor('not-a-cursor'))
+        response = self.client.get(self.url, {'after': 'not-a-cursor'})
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_forged_cursor_is_invalid(self):
+        '''Токен с id больше 64 бит или моментом без часового пояса
+        считается испорченным, а не роняет страницу'''
+        forged = (
+            '2020-01-01T00:00:00+00:00|%d' % 2 ** 64,
+            '2020-01-01T00:00:00|1',
+        )
+        urls = (reverse('posts:index'), reverse('api:posts'))
+        for raw in forged:
+            token = base64.urlsafe_b64encode(raw.encode()).decode()
+            with self.subTest(raw=raw):
+                self.assertIsNone(decode_cursor(token))
+                for url in urls:
+                    response = self.client.get(url, {'after': token})
+                    self.assertEqual(response.status_code, 200)
+
+
+class NumberedPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text='Пагинация %s' % i) for i in range(95)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_links_only_around_current_page(self):
+        '''Номера выводятся окном вокруг текущей страницы'''
+        response = self.client.get(reverse('posts:index'), {'page': 5})
+        page_obj = response.context['page_obj']
+        self.assertEqual(list(page_window(page_obj)), [2, 3, 4, 5, 6, 7, 8])
+        self.assertNotContains(response, '?page=9"')
+        self.assertContains(response, '?page=10"')
+
+    def test_explicit_numbered_mode_ignores_cursor(self):
+        '''Явный режим numbered не переключается на курсор по ?after'''
+        token = CursorPaginator(
+            Post.objects.all(), 10
+        ).get_page().next_cursor
+        response = self.client.get(reverse('posts:post_search'),
+                                   {'q': 'пагинация', 'after': token})
+        page_obj = response.context['page_obj']
+        self.assertNotIsInstance(page_obj, CursorPage)
+        self.assertEqual(page_obj.number, 1)
@@ -0,0 +1,167 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from core.queries import QueryBudgetExceeded, QueryRecorder
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+from PIL import Image
+
+from .. import urls
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def upload(color):
+    buffer = BytesIO()
+    Image.new('RGB', (20, 10), color).save(buffer, 'PNG')
+    return SimpleUploadedFile('photo.png', buffer.getvalue())
+
+
+@override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_STRICT=True,
+                   MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class QueryBudgetTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(12):
+            cls.post = Post.objects.create(
+                author=cls.author, text='Пост %s' % i, group=cls.group
+            )
+        for i in range(5):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text='Коммент %s' % i
+            )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_every_url_declares_budget(self):
+        '''Каждый URL приложения posts объявляет бюджет запросов'''
+        for pattern in urls.urlpatterns:
+            if pattern.name:
+                with self.subTest(name=pattern.name):
+                    self.assertIsNotNone(
+                        getattr(pattern.callback, 'query_budget', None)
+                    )
+
+    def test_views_fit_budget(self):
+        '''Страницы с прогретыми счётчиками укладываются в бюджет
+        запросов и не делают N+1'''
+        reader, author = self.authorized_client, self.author_client
+        addresses = (
+            (reader, reverse('posts:index')),
+            (reader, reverse('posts:group_list',
+                             kwargs={'slug': self.group.slug})),
+            (reader, reverse('posts:profile',
+                             kwargs={'username': self.author})),
+            (reader, reverse('posts:post_detail',
+                             kwargs={'post_id': self.post.id})),
+            (reader, reverse('posts:follow_index')),
+            (reader, reverse('posts:follow_states') + '?authors=1,2'),
+            (reader, reverse('posts:post_create')),
+            # Чужой пост только перенаправляет: правку открывает автор.
+            (author, reverse('posts:post_edit',
+                             kwargs={'post_id': self.post.id})),
+        )
+        for client, address in addresses:
+            with self.subTest(address=address):
+                with self.settings(QUERY_BUDGET_STRICT=False):
+                    client.get(address)
+                cache.clear()
+                response = client.get(address)
+                self.assertEqual(response.status_code, 200)
+
+    def test_write_budget_is_separate(self):
+        '''Для POST действует бюджет записи, для GET — бюджет чтения'''
+        callback = next(pattern.callback for pattern in urls.urlpatterns
+                        if pattern.name == 'post_create')
+        self.assertLess(callback.query_budget, callback.write_budget)
+        with mock.patch.object(callback, 'write_budget', 1):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.authorized_client.post(reverse('posts:post_create'),
+                                            {'text': 'Пост'})
+
+    def test_repeated_queries_are_flagged(self):
+        '''Повторяющиеся формы запросов распознаются как N+1'''
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for post in Post.objects.all()[:5]:
+                post.author.username
+        self.assertEqual(len(recorder), 6)
+        self.assertEqual(list(recorder.repeated(3).values()), [5])
+
+
+@override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_STRICT=True,
+                   MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class QueryBudgetWriteTest(TransactionTestCase):
+    '''Запись проверяется с настоящими транзакциями: в TestCase не
+    выполняются колбэки on_commit, и освобождение старой картинки не
+    попало бы в счёт'''
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='TestUser')
+        self.author = User.objects.create_user(username='Author')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.other = Group.objects.create(title='Другая', slug='other')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_writes_fit_budget(self):
+        '''Создание поста с группой и картинкой, правка с заменой
+        картинки и группы и комментарий укладываются в бюджет записи
+        вместе с сигналами, счётчиками, заявкой на файл, освобождением
+        старого файла и сбросом кэша'''
+        self.author_client.post(reverse('posts:post_create'), {
+            'text': 'Пост', 'group': self.group.id, 'image': upload('red')
+        })
+        post_id = Post.objects.get().id
+        requests = (
+            (self.authorized_client, reverse('posts:post_create'),
+             {'text': 'Новый пост', 'group': self.group.id,
+              'image': upload('green')}),
+            (self.author_client,
+             reverse('posts:post_edit', kwargs={'post_id': post_id}),
+             {'text': 'Правка', 'group': self.other.id,
+              'image': upload('blue')}),
+            (self.authorized_client,
+             reverse('posts:add_comment', kwargs={'post_id': post_id}),
+             {'text': 'Комментарий'}),
+        )
+        for client, address, data in requests:
+            with self.subTest(address=address):
+                response = client.post(address, data)
+                self.assertEqual(response.status_code, 302)
@@ -0,0 +1,95 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.backends.utils import CursorWrapper
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import recommendations
+from ..models import Follow, Post, Recommendation
+
+User = get_user_model()
+
+
+class RecommendationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        names = ('reader', 'friend', 'other_friend', 'active', 'quiet',
+                 'known')
+        cls.users = {name: User.objects.create_user(username=name)
+                     for name in names}
+        graph = (
+            ('reader', 'friend'), ('reader', 'other_friend'),
+            ('reader', 'known'),
+            ('friend', 'active'), ('friend', 'quiet'), ('friend', 'known'),
+            ('friend', 'reader'),
+            ('other_friend', 'quiet'),
+        )
+        for user, author in graph:
+            Follow.objects.create(user=cls.users[user],
+                                  author=cls.users[author])
+        for i in range(10):
+            Post.objects.create(author=cls.users['active'], text=f'Пост {i}')
+
+    def setUp(self):
+        cache.clear()
+
+    def recommended(self, name):
+        return list(Recommendation.objects.filter(
+            user=self.users[name]
+        ).values_list('author__username', 'common'))
+
+    def test_friends_of_friends_weighted_by_activity(self):
+        '''Рекомендуются авторы, которых читают подписки пользователя,
+        кроме уже прочитанных и его самого; активные авторы выше'''
+        call_command('recommend_authors', stdout=StringIO())
+        self.assertEqual(self.recommended('reader'),
+                         [('active', 1), ('quiet', 2)])
+
+    def test_chunks_and_top_limit(self):
+        '''Пачки любого размера дают тот же результат, top обрезает список'''
+        call_command('recommend_authors', chunk_size=1, stdout=StringIO())
+        by_single_users = self.recommended('reader')
+        call_command('recommend_authors', chunk_size=100, stdout=StringIO())
+        self.assertEqual(self.recommended('reader'), by_single_users)
+        call_command('recommend_authors', top=1, stdout=StringIO())
+        self.assertEqual(self.recommended('reader'), [('active', 1)])
+
+    def test_candidates_streamed_from_cursor(self):
+        '''Кандидаты читаются с курсора по строке, без fetchall'''
+        with mock.patch.object(CursorWrapper, 'fetchall', create=True,
+                               side_effect=AssertionError('fetchall')):
+            call_command('recommend_authors', stdout=StringIO())
+        self.assertEqual(self.recommended('reader'),
+                         [('active', 1), ('quiet', 2)])
+
+    def test_rebuild_replaces_stale_rows(self):
+        '''Пересчёт удаляет рекомендации, потерявшие основание'''
+        call_command('recommend_authors', stdout=StringIO())
+        Follow.objects.filter(user=self.users['reader']).delete()
+        call_command('recommend_authors', stdout=StringIO())
+        self.assertEqual(self.recommended('reader'), [])
+
+    def test_widget_reads_in_one_query(self):
+        '''Виджет на странице подписок читает рекомендации одним запросом
+        и не показывает авторов, на которых уже подписались'''
+        call_command('recommend_authors', stdout=StringIO())
+        reader = User.objects.get(pk=self.users['reader'].pk)
+        recommendations.for_user(reader)
+        with self.assertNumQueries(1):
+            shown = recommendations.for_user(reader)
+            [recommendation.author.username for recommendation in shown]
+        client = Client()
+        client.force_login(reader)
+        client.get(reverse('posts:profile_follow', args=('active',)))
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [recommendation.author.username
+             for recommendation in response.context['recommendations']],
+            ['quiet'],
+        )
+        self.assertContains(response, 'Кого почитать')
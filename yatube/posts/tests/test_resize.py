@@ -0,0 +1,150 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from core.files import RangeNotSatisfiable, byte_range
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import Client, TestCase, override_settings
+from PIL import Image
+
+from .. import resize
+from ..models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_CACHE_ROOT = os.path.join(TEMP_MEDIA_ROOT, 'resized')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT,
+                   RESIZE_CACHE_ROOT=TEMP_CACHE_ROOT,
+                   RESIZE_WIDTHS=(100, 200))
+class ResizeTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        buffer = BytesIO()
+        Image.new('RGB', (400, 300), 'green').save(buffer, 'PNG')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            image=SimpleUploadedFile('photo.png', buffer.getvalue()),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(TEMP_CACHE_ROOT, ignore_errors=True)
+        self.client = Client()
+
+    def test_srcset_tag(self):
+        '''Тег resized_srcset перечисляет подписанные варианты'''
+        rendered = Template(
+            '{% load post_cards %}{% resized_srcset post.image "960x339" %}'
+        ).render(Context({'post': self.post}))
+        urls = [variant.split()[0] for variant in rendered.split(', ')]
+        self.assertEqual(
+            [variant.split()[1] for variant in rendered.split(', ')],
+            ['100w', '200w'],
+        )
+        self.assertIn('/resize/100x35/crop/jpg/', urls[0])
+        response = self.client.get(urls[1])
+        self.assertEqual(response.status_code, 200)
+        with Image.open(BytesIO(b''.join(response.streaming_content))) as im:
+            self.assertEqual(im.size, (200, 71))
+
+    def test_unsigned_spec_is_404(self):
+        '''Изменённая ссылка без верной подписи не нарезается'''
+        url = resize.url(self.post.image.name, 100, 100)
+        tampered = url.replace('100x100', '1000x1000')
+        self.assertEqual(self.client.get(tampered).status_code, 404)
+        self.assertEqual(self.client.get(url.split('?')[0]).status_code, 404)
+
+    def test_variant_rendered_once_and_cached(self):
+        '''Вариант нарезается один раз и отдаётся с долгим кэшированием'''
+        url = resize.url(self.post.image.name, 50, 50, 'fit')
+        with mock.patch.object(resize, 'render',
+                               wraps=resize.render) as render:
+            first = self.client.get(url)
+            second = self.client.get(url)
+        self.assertEqual(render.call_count, 1)
+        self.assertIn('immutable', first['Cache-Control'])
+        self.assertEqual(first['ETag'], second['ETag'])
+        with Image.open(BytesIO(b''.join(second.streaming_content))) as im:
+            self.assertEqual(im.size, (50, 38))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_legacy_name_variant_follows_source(self):
+        '''Вариант картинки со старым именем не кэшируется навсегда
+        и нарезается заново после замены исходника'''
+        storage = Post.image.field.storage
+        name = 'posts/legacy.png'
+        buffer = BytesIO()
+        Image.new('RGB', (40, 40), 'red').save(buffer, 'PNG')
+        with open(storage.path(name), 'wb') as legacy:
+            legacy.write(buffer.getvalue())
+        url = resize.url(name, 10, 10)
+        first = self.client.get(url)
+        self.assertEqual(first['Cache-Control'],
+                         f'public, max-age={settings.MEDIA_MAX_AGE}')
+        Image.new('RGB', (40, 40), 'blue').save(storage.path(name), 'PNG')
+        os.utime(storage.path(name), ns=(0, 0))
+        second = self.client.get(url)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        with Image.open(BytesIO(b''.join(second.streaming_content))) as im:
+            self.assertGreater(im.convert('RGB').getpixel((5, 5))[2], 200)
+
+    def test_range_request(self):
+        '''Запрос Range получает часть файла'''
+        url = resize.url(self.post.image.name, 50, 50)
+        whole = b''.join(self.client.get(url).streaming_content)
+        response = self.client.get(url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'],
+                         f'bytes 10-19/{len(whole)}')
+        self.assertEqual(b''.join(response.streaming_content), whole[10:20])
+        response = self.client.get(url, HTTP_RANGE=f'bytes={len(whole)}-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_byte_range(self):
+        '''Разбор заголовка Range'''
+        cases = (
+            ('bytes=0-', (0, 99)),
+            ('bytes=90-200', (90, 99)),
+            ('bytes=-10', (90, 99)),
+            ('bytes=0-1,5-6', None),
+            ('items=0-1', None),
+        )
+        for header, expected in cases:
+            with self.subTest(header=header):
+                self.assertEqual(byte_range(header, 100), expected)
+        with self.assertRaises(RangeNotSatisfiable):
+            byte_range('bytes=100-', 100)
+
+    def test_eviction_drops_least_recently_used(self):
+        '''При переполнении удаляются давно не запрошенные варианты'''
+        name = self.post.image.name
+        old = resize.get(name, 60, 60, 'crop', 'jpg')
+        recent = resize.get(name, 70, 70, 'crop', 'jpg')
+        os.utime(old, (1, 1))
+        os.utime(recent, (2, 2))
+        resize.get(name, 60, 60, 'crop', 'jpg')
+        # Три варианта сплошного цвета весят почти одинаково: лимит
+        # вмещает два, после очистки должно остаться не больше 90%.
+        limit = int(os.path.getsize(recent) * 2.5)
+        with override_settings(RESIZE_CACHE_MAX_BYTES=limit):
+            newest = resize.get(name, 80, 80, 'crop', 'jpg')
+        self.assertTrue(os.path.exists(old))
+        self.assertFalse(os.path.exists(recent))
+        self.assertTrue(os.path.exists(newest))
@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Post
+from ..search import match_expression, search
+
+User = get_user_model()
+
+
+class PostSearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.admin = User.objects.create_superuser(
+            username='Admin', email='admin@example.com', password='pass'
+        )
+        cls.old = Post.objects.create(author=cls.user,
+                                      text='Ежики любят яблоки')
+        Post.objects.filter(id=cls.old.id).update(
+            pub_date=timezone.now() - timedelta(days=365)
+        )
+        cls.fresh = Post.objects.create(author=cls.user,
+                                        text='Ежики тоже любят яблоки')
+        cls.other = Post.objects.create(author=cls.user,
+                                        text='Совсем про другое')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_match_expression_escapes_input(self):
+        '''Ввод пользователя превращается в префиксы слов в кавычках'''
+        self.assertEqual(match_expression('ежи "OR" *'), '"ежи"* "OR"*')
+        self.assertIsNone(match_expression(' * - '))
+
+    def test_search_ranks_fresh_posts_higher(self):
+        '''При равной релевантности свежий пост стоит выше старого'''
+        self.assertEqual(list(search('ежик ябл')), [self.fresh, self.old])
+        self.assertEqual(list(search('другое')), [self.other])
+        self.assertEqual(list(search('')), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        '''Индекс обновляется при update() и удалении поста'''
+        Post.objects.filter(id=self.other.id).update(text='Новый текст')
+        self.assertEqual(list(search('другое')), [])
+        self.assertEqual(list(search('новый')), [self.other])
+        Post.objects.filter(id=self.other.id).delete()
+        self.assertEqual(list(search('новый')), [])
+
+    def test_search_page(self):
+        '''Страница поиска выводит найденные посты с пагинацией'''
+        for i in range(12):
+            Post.objects.create(author=self.user, text=f'Пагинация {i}')
+        url = reverse('posts:post_search')
+        response = self.guest_client.get(url, {'q': 'пагинация'})
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertContains(response, '?q=%D0%BF%D0%B0%D0%B3%D0%B8%D0%BD'
+                                      '%D0%B0%D1%86%D0%B8%D1%8F&amp;page=2')
+        response = self.guest_client.get(
+            url, {'q': 'пагинация', 'page': 2}
+        )
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+    def test_admin_search_uses_index(self):
+        '''Поиск в админке идёт через полнотекстовый индекс'''
+        client = Client()
+        client.force_login(self.admin)
+        response = client.get(reverse('admin:posts_post_changelist'),
+                              {'q': 'ябл'})
+        self.assertEqual(response.context['cl'].result_count, 2)
@@ -0,0 +1,46 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Count, F, Sum
+from django.test import TestCase
+
+from ..models import Comment, Follow, Group, Post, TimelineEntry, UserStats
+
+User = get_user_model()
+
+
+class SeedDataTest(TestCase):
+    def test_seed_data_fills_database(self):
+        '''seed_data создаёт объекты, счётчики и ленты подписок'''
+        call_command('seed_data', users=30, groups=3, posts=200,
+                     comments=100, follows=80, chunk_size=50, seed=1,
+                     stdout=StringIO())
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertEqual(Follow.objects.count(), 80)
+        self.assertEqual(
+            UserStats.objects.aggregate(total=Sum('posts'))['total'], 200
+        )
+        expected = Follow.objects.annotate(
+            posts=Count('author__posts')
+        ).aggregate(total=Sum('posts'))['total']
+        self.assertEqual(TimelineEntry.objects.count(), expected)
+
+    def test_seed_data_without_timelines(self):
+        '''Флаг --no-timelines пропускает заполнение лент'''
+        call_command('seed_data', users=10, posts=20, follows=10, seed=1,
+                     no_timelines=True, stdout=StringIO())
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_dense_follow_graph_terminates(self):
+        '''Даже полный граф подписок строится без повторов и зацикливания'''
+        call_command('seed_data', users=5, posts=0, comments=0, follows=100,
+                     seed=1, no_timelines=True, stdout=StringIO())
+        self.assertEqual(Follow.objects.count(), 20)
+        self.assertFalse(
+            Follow.objects.filter(user=F('author')).exists()
+        )
+        self.assertEqual(User.objects.create_user(username='new').id, 6)
@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post
+
+User = get_user_model()
+
+
+class ServerTimingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def test_header_reports_db_and_templates(self):
+        '''С включённым профилированием ответ содержит Server-Timing'''
+        with override_settings(SERVER_TIMING_ENABLED=True):
+            client = Client()
+            with self.assertLogs('core.middleware', 'INFO') as logs:
+                response = client.get(reverse(
+                    'posts:post_detail', kwargs={'post_id': self.post.id}
+                ))
+        header = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'thumbnail;dur=', 'total;dur='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, header)
+        self.assertNotIn('SQL (0)', header)
+        self.assertIn('"db_count"', logs.output[-1])
+
+    def test_disabled_by_default(self):
+        '''Без SERVER_TIMING_ENABLED заголовок не отдаётся'''
+        response = Client().get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
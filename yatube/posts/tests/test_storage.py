@@ -0,0 +1,145 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+
+from .. import images, storage
+from ..models import Post, StoredImage
+from ..thumbnails import SIZES
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def upload(color, name='photo.png'):
+    buffer = BytesIO()
+    Image.new('RGB', (20, 10), color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+# Миниатюры нарезаются в том же потоке: фоновый поток пережил бы тест
+# и писал бы во временный MEDIA_ROOT после его удаления.
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ContentAddressedStorageTest(TransactionTestCase):
+    '''Проверки идут с настоящими коммитами: файлы освобождаются
+    в transaction.on_commit'''
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='TestUser')
+
+    def create(self, image):
+        return Post.objects.create(author=self.user, text='Пост', image=image)
+
+    def test_identical_uploads_share_one_file(self):
+        '''Одинаковые картинки хранятся одним файлом с именем по хэшу'''
+        first = self.create(upload('red', 'first.png'))
+        second = self.create(upload('red', 'second.png'))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name,
+                         r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.png$')
+        directory = first.image.name.rsplit('/', 1)[0]
+        self.assertEqual(len(first.image.storage.listdir(directory)[1]), 1)
+        other = self.create(upload('blue'))
+        self.assertNotEqual(other.image.name, first.image.name)
+
+    def test_thumbnails_are_shared(self):
+        '''Посты с одной картинкой получают одну и ту же миниатюру'''
+        first = self.create(upload('red', 'first.png'))
+        second = self.create(upload('red', 'second.png'))
+        geometry, options = SIZES[0]
+        self.assertEqual(
+            get_thumbnail(first.image, geometry, **options).name,
+            get_thumbnail(second.image, geometry, **options).name,
+        )
+
+    def test_file_is_removed_with_last_reference(self):
+        '''Файл и миниатюры удаляются вместе с последним постом'''
+        first = self.create(upload('red'))
+        second = self.create(upload('red'))
+        name = first.image.name
+        geometry, options = SIZES[0]
+        thumbnail = get_thumbnail(first.image, geometry, **options).name
+        first.delete()
+        self.assertTrue(first.image.storage.exists(name))
+        self.assertTrue(default_storage.exists(thumbnail))
+        second.delete()
+        self.assertFalse(first.image.storage.exists(name))
+        self.assertFalse(default_storage.exists(thumbnail))
+
+    def test_replaced_image_is_released(self):
+        '''Заменённая картинка удаляется, если больше никому не нужна'''
+        post = self.create(upload('red'))
+        old_name = post.image.name
+        post.image = upload('blue')
+        post.save()
+        self.assertFalse(post.image.storage.exists(old_name))
+        self.assertTrue(post.image.storage.exists(post.image.name))
+
+    def test_pending_upload_keeps_released_file(self):
+        '''Файл не удаляется, пока загрузка того же содержимого
+        не закоммичена, и удаляется с последней закоммиченной ссылкой'''
+        post = self.create(upload('red'))
+        name = post.image.name
+        storage = post.image.storage
+        # Параллельный запрос уже сохранил файл, но пост ещё не записал.
+        self.assertEqual(storage.save('posts/again.png', upload('red')), name)
+        post.delete()
+        self.assertTrue(storage.exists(name))
+        pending = Post.objects.create(author=self.user, text='Пост',
+                                      image=name)
+        images.attached(name)
+        pending.delete()
+        self.assertFalse(storage.exists(name))
+
+    def test_claim_is_kept_in_database(self):
+        '''Заявка на файл хранится в базе и видна всем процессам,
+        а не в локальном кэше'''
+        name = Post.image.field.storage.save('posts/photo.png',
+                                             upload('red'))
+        cache.clear()
+        self.assertEqual(StoredImage.objects.get(name=name).claims, 1)
+        self.assertTrue(storage.is_claimed(name))
+        images.attached(name)
+        self.assertFalse(storage.is_claimed(name))
+
+    def test_expired_claim_does_not_keep_file(self):
+        '''Заявка откатившейся загрузки не держит файл дольше
+        IMAGE_CLAIM_TIMEOUT'''
+        post = self.create(upload('red'))
+        name = post.image.name
+        post.image.storage.save('posts/again.png', upload('red'))
+        expired = timezone.now() - timedelta(
+            seconds=settings.IMAGE_CLAIM_TIMEOUT + 1
+        )
+        StoredImage.objects.filter(name=name).update(claimed=expired)
+        post.delete()
+        self.assertFalse(post.image.storage.exists(name))
+        self.assertFalse(StoredImage.objects.filter(name=name).exists())
+
+    def test_file_is_kept_without_lock(self):
+        '''Если строку файла не удалось заблокировать, файл
+        не удаляется'''
+        post = self.create(upload('red'))
+        name = post.image.name
+        with mock.patch.object(storage, 'lock',
+                               side_effect=OperationalError('locked')):
+            with self.assertLogs('posts.images', 'ERROR'):
+                post.delete()
+        self.assertTrue(post.image.storage.exists(name))
@@ -0,0 +1,119 @@
+import shutil
+import tempfile
+import time
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+
+from ..models import Post
+from ..thumbnails import SIZES, _lock_key, _url_key, prefetch
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            image=SimpleUploadedFile(name='small.gif', content=SMALL_GIF,
+                                     content_type='image/gif'),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_command_backfills_thumbnails(self):
+        '''Команда generate_thumbnails нарезает миниатюры всех размеров'''
+        out = StringIO()
+        call_command('generate_thumbnails', stdout=out)
+        self.assertIn('1', out.getvalue())
+        for geometry, options in SIZES:
+            with self.subTest(geometry=geometry):
+                thumbnail = get_thumbnail(self.post.image, geometry, **options)
+                self.assertTrue(default_storage.exists(thumbnail.name))
+
+    @override_settings(THUMBNAIL_LOCK_WAIT=0.2)
+    def test_locked_image_waits_for_other_worker(self):
+        '''Пока миниатюру нарезает другой процесс, запрос ждёт его,
+        а готовую миниатюру отдаёт без ожидания'''
+        geometry, options = SIZES[0]
+        pending = default.backend.thumbnail_file(
+            self.post.image, geometry, **options
+        )
+        pending.delete()
+        default.kvstore.delete(pending)
+        cache.add(_lock_key(pending), 1, 60)
+        started = time.monotonic()
+        thumbnail = get_thumbnail(self.post.image, geometry, **options)
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+        self.assertTrue(default_storage.exists(thumbnail.name))
+        started = time.monotonic()
+        get_thumbnail(self.post.image, geometry, **options)
+        self.assertLess(time.monotonic() - started, 0.2)
+
+    def test_prefetch_resolves_page_in_one_lookup(self):
+        '''Ссылки на миниатюры страницы берутся из кэша одним запросом'''
+        prefetch(Post.objects.all())
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(0):
+            prefetch(posts)
+        url = get_thumbnail(self.post.image, SIZES[0][0], **SIZES[0][1]).url
+        self.assertEqual(posts[0].thumbnail_url, url)
+
+    def test_prefetch_misses_read_kvstore_once(self):
+        '''Промахи кэша ссылок разрешаются одним запросом к kvstore'''
+        for color in ('red', 'green', 'blue'):
+            image = BytesIO()
+            Image.new('RGB', (2, 2), color).save(image, 'GIF')
+            Post.objects.create(author=self.user, text=color,
+                                image=SimpleUploadedFile(
+                                    name=f'{color}.gif',
+                                    content=image.getvalue(),
+                                    content_type='image/gif'))
+        prefetch(Post.objects.all())
+        cache.clear()
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(1):
+            prefetch(posts)
+        self.assertEqual(len({post.thumbnail_url for post in posts}), 4)
+
+    def test_image_change_drops_cached_url(self):
+        '''Смена картинки поста сбрасывает закэшированную ссылку'''
+        post = Post.objects.get(id=self.post.id)
+        old_name = post.image.name
+        prefetch([post])
+        self.assertIsNotNone(cache.get(_url_key(old_name, SIZES[0])))
+        other = BytesIO()
+        Image.new('RGB', (2, 2), 'blue').save(other, 'GIF')
+        post.image = SimpleUploadedFile(
+            name='other.gif', content=other.getvalue(),
+            content_type='image/gif'
+        )
+        post.save()
+        self.assertIsNone(cache.get(_url_key(old_name, SIZES[0])))
@@ -0,0 +1,110 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry, UserStats
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.author = User.objects.create_user(username='Author')
+        cls.old_post = Post.objects.create(author=cls.author, text='Старый')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def feed(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def follow(self):
+        self.authorized_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author}
+        ))
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        '''Подписка добавляет в ленту посты автора, отписка убирает их'''
+        self.follow()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user, post=self.old_post
+        ).exists())
+        self.assertEqual(self.feed(), [self.old_post])
+        self.authorized_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.author}
+        ))
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+        self.assertEqual(self.feed(), [])
+
+    def test_new_post_fans_out_to_followers(self):
+        '''Новый пост попадает в ленты подписчиков при публикации'''
+        self.follow()
+        post = Post.objects.create(author=self.author, text='Новый')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user, post=post
+        ).exists())
+        self.assertEqual(self.feed(), [post, self.old_post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_popular_author_is_read_on_request(self):
+        '''Посты популярных авторов не раскладываются по лентам,
+        а подмешиваются в ленту при чтении'''
+        self.follow()
+        post = Post.objects.create(author=self.author, text='Новый')
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [post, self.old_post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_crossing_limit_rebuilds_timelines(self):
+        '''Автор, ставший популярным, убирается из лент, а вернувшийся
+        под предел раскладывается снова вместе с постами, вышедшими,
+        пока он был популярен'''
+        fan = User.objects.create_user(username='Fan')
+        self.follow()
+        Follow.objects.create(user=fan, author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        post = Post.objects.create(author=self.author, text='Новый')
+        self.assertEqual(self.feed(), [post, self.old_post])
+        Follow.objects.get(user=fan).delete()
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list('user', 'post')),
+            {(self.user.id, post.id), (self.user.id, self.old_post.id)},
+        )
+        self.assertEqual(self.feed(), [post, self.old_post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_rebuild_agrees_with_feed_on_drifted_stats(self):
+        '''Пересборка лент считает автора популярным по UserStats, как
+        feed(), и посты не пропадают, даже если счётчик разошёлся
+        с реальным числом подписок'''
+        fan = User.objects.create_user(username='Fan')
+        self.follow()
+        Follow.objects.create(user=fan, author=self.author)
+        UserStats.objects.filter(user=self.author).update(followers=1)
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.feed(), [self.old_post])
+        UserStats.objects.filter(user=self.author).update(followers=5)
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [self.old_post])
+
+    @override_settings(PAGINATION_MODE='cursor')
+    def test_feed_cursor_pagination(self):
+        '''Лента подписок поддерживает курсорную пагинацию'''
+        Follow.objects.create(user=self.user, author=self.author)
+        for i in range(10):
+            Post.objects.create(author=self.author, text='Пост %s' % i)
+        url = reverse('posts:follow_index')
+        first = self.authorized_client.get(url).context['page_obj']
+        second = self.authorized_client.get(
+            url, {'after': first.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(second), [self.old_post])
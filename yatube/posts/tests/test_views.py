@@ -1,6 +1,9 @@
 import shutil
 import tempfile
+import time
+from unittest import mock
 
+from core import caches
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -57,6 +60,7 @@ class ViewTest(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
         self.page_count = 10
@@ -176,13 +180,67 @@ class ViewTest(TestCase):
                 self.assertIsInstance(form_field, expected)
 
     def test_cache_index_page_view(self):
-        '''Тестирование кэша index_page'''
+        '''Тестирование кэша index_page: страница отдаётся из кэша,
+        пока посты не меняются, и сбрасывается при удалении поста'''
         response = self.authorized_client.get(reverse('posts:index'))
-        Post.objects.filter(id=self.post_id).delete()
+        latest = Post.objects.filter(id=Post.objects.first().id)
+        latest.update(text='Без сигналов')
+        response_cached = self.authorized_client.get(reverse('posts:index'))
+        self.assertEqual(response.content, response_cached.content)
+        self.assertIn('max-age=0', response_cached['Cache-Control'])
+        self.assertFalse(response_cached.has_header('Expires'))
+        latest.delete()
         response_after_del = self.authorized_client.get(reverse('posts:index'))
-        self.assertEqual(response.content, response_after_del.content)
-        cache.clear()
-        response_clear_cache = self.authorized_client.get(
-            reverse('posts:index')
-        )
-        self.assertNotEqual(response.content, response_clear_cache.content)
+        self.assertNotEqual(response.content, response_after_del.content)
+
+    def test_local_cache_keeps_pages_briefly(self):
+        '''С LocMemCache страница живёт не дольше LOCAL_CACHE_TIMEOUT:
+        сброс поколения в другом процессе сюда не доходит'''
+        url = reverse('posts:index')
+        self.authorized_client.get(url)
+        text = 'Правка из другого процесса'
+        Post.objects.filter(id=Post.objects.first().id).update(text=text)
+        self.assertNotContains(self.authorized_client.get(url), text)
+        later = time.time() + settings.LOCAL_CACHE_TIMEOUT + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertContains(self.authorized_client.get(url), text)
+        self.assertEqual(caches.timeout(None), settings.LOCAL_CACHE_TIMEOUT)
+        shared = {'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        }}
+        with self.settings(CACHES=shared):
+            self.assertIsNone(caches.timeout(None))
+            self.assertEqual(caches.timeout(settings.PAGE_CACHE_TIMEOUT),
+                             settings.PAGE_CACHE_TIMEOUT)
+
+    def test_post_edit_invalidates_group_pages(self):
+        '''Перенос поста в другую группу сбрасывает кэш обеих групп'''
+        group_url = self.templates_pages_names['group_list'][1]
+        group_two_url = self.templates_pages_names['group_list_two'][1]
+        self.authorized_client.get(group_url)
+        self.authorized_client.get(group_two_url)
+        post = Post.objects.get(id=self.post_id)
+        post.group = self.group_two
+        post.save()
+        response = self.authorized_client.get(group_two_url)
+        self.assertIn(post, response.context['page_obj'])
+        response = self.authorized_client.get(group_url)
+        self.assertNotIn(post, response.context['page_obj'])
+
+    def test_group_rename_and_delete_invalidate_pages(self):
+        '''Смена адреса группы сбрасывает кэш старого адреса, удаление
+        группы — кэш профилей её авторов'''
+        old_url = self.templates_pages_names['group_list_two'][1]
+        self.assertEqual(self.authorized_client.get(old_url).status_code,
+                         200)
+        group = Group.objects.get(id=self.group_two.id)
+        group.slug = 'renamed'
+        group.save()
+        self.assertEqual(self.authorized_client.get(old_url).status_code,
+                         404)
+        profile_url = reverse('posts:profile', args=(self.user.username,))
+        self.assertContains(self.authorized_client.get(profile_url),
+                            self.group.title)
+        Group.objects.filter(id=self.group.id).delete()
+        self.assertNotContains(self.authorized_client.get(profile_url),
+                               self.group.title)
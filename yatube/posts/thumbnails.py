@@ -0,0 +1,199 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import md5
+
+from core.queries import unbudgeted
+from core.timing import measure
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.models import KVStore
+
+from .models import Post
+from .storage import HASHED_NAME
+
+logger = logging.getLogger(__name__)
+
+# Размеры должны совпадать с тегами {% thumbnail %} в шаблонах.
+SIZES = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+# Миниатюры картинок с именем по хэшу лежат отдельно: их содержимое
+# определено именем, и media отдаёт их как immutable.
+HASHED_PREFIX = 'hashed/'
+
+_executor = None
+
+
+def _url_key(name, size):
+    return 'thumbnail-url:' + md5(f'{size}:{name}'.encode()).hexdigest()
+
+
+def _lock_key(file_):
+    name = getattr(file_, 'name', file_)
+    return 'thumbnail-lock:' + md5(str(name).encode()).hexdigest()
+
+
+class LockingThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl, который не даёт одновременно нарезать одну и ту же
+    миниатюру: опоздавшие ждут первого.
+
+    Блокировка лежит в кэше, поэтому между процессами работает только
+    с общим кэшем (см. core.caches). С LocMemCache она согласует лишь
+    потоки одного процесса, а процессы могут нарезать миниатюру
+    одновременно — это лишняя работа, а не ошибка.
+
+    Блокировка берётся только при промахе kvstore, готовые миниатюры
+    отдаются без лишних обращений к кэшу.
+    """
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        # Прогретая миниатюра берётся из кэша kvstore без SQL; запросы
+        # здесь — первая нарезка, и в бюджет view они не входят.
+        with measure('thumbnail'), unbudgeted():
+            return super().get_thumbnail(file_, geometry_string, **options)
+
+    def thumbnail_file(self, file_, geometry_string, **options):
+        """Файл миниатюры, под которым get_thumbnail ищет её в kvstore."""
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def _get_thumbnail_filename(self, source, geometry_string, options):
+        name = super()._get_thumbnail_filename(source, geometry_string,
+                                               options)
+        if not HASHED_NAME.search(source.name):
+            return name
+        prefix = sorl_settings.THUMBNAIL_PREFIX
+        return prefix + HASHED_PREFIX + name[len(prefix):]
+
+    def _create_thumbnail(self, source_image, geometry_string, options,
+                          thumbnail):
+        key = _lock_key(thumbnail)
+        if cache.add(key, 1, settings.THUMBNAIL_LOCK_TIMEOUT):
+            try:
+                return super()._create_thumbnail(
+                    source_image, geometry_string, options, thumbnail
+                )
+            finally:
+                cache.delete(key)
+        deadline = time.monotonic() + settings.THUMBNAIL_LOCK_WAIT
+        while cache.get(key) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        if thumbnail.exists():
+            thumbnail.set_size()
+            return None
+        return super()._create_thumbnail(
+            source_image, geometry_string, options, thumbnail
+        )
+
+
+def stored(thumbnails):
+    """Уже нарезанные миниатюры из kvstore sorl: одно обращение к кэшу
+    и один запрос к таблице kvstore на все промахи кэша.
+
+    Возвращает {имя: ImageFile} только для найденных миниатюр.
+    """
+    keys = {add_prefix(thumbnail.key): thumbnail.name
+            for thumbnail in thumbnails}
+    values = default.kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        values.update(KVStore.objects.filter(
+            key__in=missing
+        ).values_list('key', 'value'))
+    return {keys[key]: deserialize_image_file(value)
+            for key, value in values.items()
+            if value and value != EMPTY_VALUE}
+
+
+def generate(name):
+    # Хранилище поля входит в ключ sorl: миниатюры, нарезанные по имени,
+    # должны совпасть с теми, что шаблоны ищут по post.image.
+    source = ImageFile(name, Post.image.field.storage)
+    for geometry, options in SIZES:
+        get_thumbnail(source, geometry, **options)
+
+
+def _generate_logged(name):
+    try:
+        generate(name)
+    except Exception:
+        logger.exception('Не удалось нарезать миниатюры для %s', name)
+
+
+def _work(name):
+    try:
+        _generate_logged(name)
+    finally:
+        connection.close()
+
+
+def schedule(name):
+    """Нарезает миниатюры после коммита транзакции: в фоновом потоке или,
+    при THUMBNAIL_WORKERS = 0, сразу в текущем."""
+    global _executor
+    if not settings.THUMBNAIL_WORKERS:
+        transaction.on_commit(lambda: _generate_logged(name))
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    transaction.on_commit(lambda: _executor.submit(_work, name))
+
+
+def prefetch(posts, size=SIZES[0]):
+    """Проставляет постам thumbnail_url за одно обращение к кэшу.
+
+    Промахи ищутся в kvstore sorl одним запросом, ещё не нарезанные
+    миниатюры нарезаются через sorl. Найденное докладывается в кэш
+    одним set_many.
+    """
+    geometry, options = size
+    keys = {post: _url_key(post.image.name, size) for post in posts
+            if post.image}
+    urls = cache.get_many(keys.values())
+    files = {post: default.backend.thumbnail_file(
+        post.image, geometry, **options
+    ) for post, key in keys.items() if key not in urls}
+    with unbudgeted():
+        found = stored(files.values()) if files else {}
+    missing = {}
+    for post, key in keys.items():
+        if key not in urls:
+            thumbnail = found.get(files[post].name) or get_thumbnail(
+                post.image, geometry, **options
+            )
+            urls[key] = missing[key] = thumbnail.url
+        post.thumbnail_url = urls[key]
+    if missing:
+        cache.set_many(missing, settings.THUMBNAIL_URL_CACHE_TIMEOUT)
+
+
+def forget(name):
+    cache.delete_many([_url_key(name, size) for size in SIZES])
+
+
+def is_immutable(name):
+    """Миниатюра картинки с именем по хэшу: под тем же именем другого
+    содержимого не появится."""
+    return name.startswith(sorl_settings.THUMBNAIL_PREFIX + HASHED_PREFIX)
@@ -0,0 +1,153 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+
+from . import counters
+from .models import Follow, Post, TimelineEntry, UserStats
+
+FEED_KEYS = ('feed_date', 'feed_post')
+
+
+def is_fanned_out(author_id):
+    """Посты автора раскладываются по лентам, пока у него не больше
+    TIMELINE_FANOUT_LIMIT подписчиков. Число берётся из UserStats,
+    как и в feed()."""
+    followers = counters.stats_by_id(author_id).followers
+    return followers <= settings.TIMELINE_FANOUT_LIMIT
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if not is_fanned_out(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id,
+                       post=post,
+                       author_id=post.author_id,
+                       pub_date=post.pub_date)
+         for user_id in followers.iterator()),
+        batch_size=500,
+    )
+
+
+def backfill(user, author):
+    """Добавляет в ленту свежие посты автора после подписки."""
+    posts = Post.objects.filter(author=author).exclude(
+        timeline__user=user
+    ).order_by('-pub_date').values_list('id', 'pub_date')
+    limit = settings.TIMELINE_BACKFILL
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user=user,
+                       post_id=post_id,
+                       author=author,
+                       pub_date=pub_date)
+         for post_id, pub_date in posts[:limit]),
+        batch_size=500,
+    )
+
+
+def trim(user, author):
+    """Убирает из ленты посты автора после отписки."""
+    TimelineEntry.objects.filter(user=user, author=author).delete()
+
+
+def followers_changed(author_id, delta):
+    """Перестраивает ленты подписчиков, когда автор пересёк
+    TIMELINE_FANOUT_LIMIT.
+
+    Ставший популярным автор читается в feed() при запросе, и его
+    записи убираются из лент. Вернувшийся под предел автор снова
+    раскладывается: в ленты подписчиков попадают его свежие посты,
+    в том числе опубликованные, пока он был популярен.
+
+    Возвращает, раскладываются ли теперь посты автора по лентам.
+    """
+    followers = counters.stats_by_id(author_id).followers
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    if followers - delta <= limit < followers:
+        TimelineEntry.objects.filter(
+            author_id=author_id,
+            user__in=Follow.objects.filter(
+                author_id=author_id
+            ).values('user'),
+        ).delete()
+    elif followers <= limit < followers - delta:
+        fan_out_author(author_id)
+    return followers <= limit
+
+
+def fan_out_author(author_id):
+    """Добавляет свежие посты автора в ленты всех его подписчиков
+    одним INSERT ... SELECT."""
+    entry, follow, post = (model._meta.db_table
+                           for model in (TimelineEntry, Follow, Post))
+    sql = (f'INSERT INTO {entry} (user_id, post_id, author_id, pub_date) '
+           f'SELECT f.user_id, p.id, p.author_id, p.pub_date '
+           f'FROM {follow} f INNER JOIN ('
+           f'SELECT id, author_id, pub_date FROM {post} '
+           f'WHERE author_id = %s ORDER BY pub_date DESC LIMIT %s'
+           f') p ON p.author_id = f.author_id '
+           f'WHERE f.author_id = %s AND NOT EXISTS ('
+           f'SELECT 1 FROM {entry} e '
+           f'WHERE e.user_id = f.user_id AND e.post_id = p.id)')
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [author_id, settings.TIMELINE_BACKFILL,
+                             author_id])
+
+
+def feed(user):
+    """Лента подписок: записи из материализованной ленты пользователя
+    плюс посты популярных авторов, которые читаются при запросе.
+
+    Популярные авторы определяются по счётчику подписчиков в UserStats,
+    а не подсчётом их подписок.
+    """
+    popular = Follow.objects.filter(
+        user=user,
+        author__stats__followers__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).values('author')
+    posts = Post.objects.select_related('author', 'group')
+    if not popular.exists():
+        return posts.filter(timeline__user=user).annotate(
+            feed_date=F('timeline__pub_date'),
+            feed_post=F('timeline__post'),
+        ).order_by('-feed_date', '-feed_post')
+    entries = TimelineEntry.objects.filter(user=user).values('post')
+    return posts.filter(
+        Q(id__in=entries) | Q(author__in=popular)
+    ).annotate(
+        feed_date=F('pub_date'),
+        feed_post=F('id'),
+    ).order_by('-feed_date', '-feed_post')
+
+
+def popular_authors():
+    """Авторы, которых feed() читает при запросе: тот же счётчик
+    подписчиков из UserStats, что в feed() и is_fanned_out()."""
+    return list(UserStats.objects.filter(
+        followers__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).values_list('user_id', flat=True))
+
+
+def rebuild(user_ids, popular):
+    """Собирает ленты пачки пользователей заново одним INSERT ... SELECT:
+    все посты авторов, на которых они подписаны, кроме популярных."""
+    user_ids = list(user_ids)
+    entry, follow, post = (model._meta.db_table
+                           for model in (TimelineEntry, Follow, Post))
+    sql = (f'INSERT INTO {entry} (user_id, post_id, author_id, pub_date) '
+           f'SELECT f.user_id, p.id, p.author_id, p.pub_date '
+           f'FROM {follow} f INNER JOIN {post} p '
+           f'ON p.author_id = f.author_id '
+           f'WHERE f.user_id IN ({", ".join(["%s"] * len(user_ids))})')
+    params = list(user_ids)
+    if popular:
+        sql += f' AND f.author_id NOT IN ({", ".join(["%s"] * len(popular))})'
+        params += popular
+    with transaction.atomic():
+        TimelineEntry.objects.filter(user_id__in=user_ids).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
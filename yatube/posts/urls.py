@@ -1,45 +1,95 @@
+from core.queries import budget
 from django.conf import settings
-from django.conf.urls.static import static
 from django.urls import path
 
-from . import views
+from . import feeds, views
 
 app_name = 'posts'
 
-urlpatterns = [path('', views.index, name='index'),
+# Второй аргумент budget — предельное число SQL-запросов на запрос,
+# включая загрузку сессии и пользователя; writes — бюджет POST-запроса.
+# Правка с заменой картинки оплачивает и освобождение старого файла
+# (блокировка строки StoredImage и чистка записей sorl).
+urlpatterns = [path('', budget(views.index, 4), name='index'),
+               path('feeds/rss/',
+                    budget(feeds.index_rss, 3),
+                    name='index_rss'
+                    ),
+               path('feeds/atom/',
+                    budget(feeds.index_atom, 3),
+                    name='index_atom'
+                    ),
+               path('group/<slug:slug>/rss/',
+                    budget(feeds.group_rss, 4),
+                    name='group_rss'
+                    ),
+               path('group/<slug:slug>/atom/',
+                    budget(feeds.group_atom, 4),
+                    name='group_atom'
+                    ),
+               path('profile/<str:username>/rss/',
+                    budget(feeds.profile_rss, 4),
+                    name='profile_rss'
+                    ),
+               path('profile/<str:username>/atom/',
+                    budget(feeds.profile_atom, 4),
+                    name='profile_atom'
+                    ),
                path('profile/<str:username>/',
-                    views.profile,
+                    budget(views.profile, 6),
                     name='profile'
                     ),
                path('posts/<int:post_id>/',
-                    views.post_detail,
+                    budget(views.post_detail, 6),
                     name='post_detail'
                     ),
+               path('posts/<int:post_id>/comments/',
+                    budget(views.post_comments, 3),
+                    name='post_comments'
+                    ),
                path('group/<slug:slug>/',
-                    views.group_posts,
+                    budget(views.group_posts, 5),
                     name='group_list'
                     ),
-               path('create/', views.post_create, name='post_create'),
+               path('search/',
+                    budget(views.post_search, 4),
+                    name='post_search'
+                    ),
+               path('resize/<int:width>x<int:height>/<str:mode>/'
+                    '<str:extension>/<path:name>',
+                    budget(views.resized_image, 0),
+                    name='resize'
+                    ),
+               path('create/',
+                    budget(views.post_create, 3, writes=14),
+                    name='post_create'
+                    ),
                path('posts/<int:post_id>/edit/',
-                    views.post_edit,
+                    budget(views.post_edit, 4, writes=22),
                     name='post_edit'
                     ),
                path('posts/<int:post_id>/comment/',
-                    views.add_comment,
+                    budget(views.add_comment, 6, writes=7),
                     name='add_comment'
                     ),
-               path('follow/', views.follow_index, name='follow_index'),
+               path('follow/',
+                    budget(views.follow_index, 7),
+                    name='follow_index'
+                    ),
+               path('follow/states/',
+                    budget(views.follow_states, 3),
+                    name='follow_states'
+                    ),
                path('profile/<str:username>/follow/',
-                    views.profile_follow,
+                    budget(views.profile_follow, 13),
                     name='profile_follow'
                     ),
                path('profile/<str:username>/unfollow/',
-                    views.profile_unfollow,
+                    budget(views.profile_unfollow, 12),
                     name='profile_unfollow'
                     ),
+               path(settings.MEDIA_URL.lstrip('/') + '<path:path>',
+                    budget(views.media, 0),
+                    name='media'
+                    ),
                ]
-
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
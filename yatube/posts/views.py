@@ -1,13 +1,32 @@
+import os
+
+from core.files import IMMUTABLE, file_response
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.utils._os import safe_join
+from django.utils.http import urlencode
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_safe
 from utils import paginator
+from utils.paginator import CursorPaginator
 
+from . import (counters, follows, recommendations, resize, search,
+               thumbnails, timeline)
+from .conditional import (conditional_page, group_etag, index_etag,
+                          post_etag, profile_etag)
 from .forms import CommentForm, PostForm
+from .generations import cache_by_generation
 from .models import Comment, Follow, Group, Post, User
+from .storage import HASHED_NAME
+
+COMMENT_KEYS = ('created', 'id')
 
 
-@cache_page(20, key_prefix="index_page")
+@conditional_page(index_etag)
+@cache_by_generation('index')
 def index(request):
     template = 'posts/index.html'
     posts = Post.objects.select_related('author', 'group').all()
@@ -16,10 +35,12 @@ def index(request):
     return render(request, template, context)
 
 
+@conditional_page(group_etag)
+@cache_by_generation('group', 'slug')
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('group').all()
+    posts = group.posts.select_related('author', 'group').all()
     page_obj = paginator.page(posts, request)
     context = {'group': group,
                'page_obj': page_obj,
@@ -27,27 +48,34 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@conditional_page(profile_etag)
+@cache_by_generation('profile', 'username')
 def profile(request, username):
     template = 'posts/profile.html'
     user = get_object_or_404(User, username=username)
-    posts = Post.objects.filter(author_id=user.id)
-    post_count = posts.count()
-    page_obj = paginator.page(posts, request)
-    following = user.following.exists()
+    posts = Post.objects.select_related('author', 'group').filter(
+        author_id=user.id
+    )
+    stats = counters.stats_for(user)
+    page_obj = paginator.page(posts, request, count=stats.posts)
+    following = follows.is_following(request.user, user)
     context = {'page_obj': page_obj,
                'author': user,
-               'post_count': post_count,
+               'post_count': stats.posts,
+               'stats': stats,
                'following': following,
                }
     return render(request, template, context)
 
 
+@conditional_page(post_etag)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
-    comments = Comment.objects.filter(post_id=post_id)
+    post = get_object_or_404(Post.objects.select_related('author', 'group'),
+                             pk=post_id)
+    comments = comment_page(request, post_id)
     form = CommentForm(request.POST or None)
-    post_count = Post.objects.filter(author_id=post.author.id).count()
+    post_count = counters.stats_for(post.author).posts
     context = {'post_count': post_count,
                'post': post,
                'form': form,
@@ -56,6 +84,40 @@ def post_detail(request, post_id):
     return render(request, template, context)
 
 
+def comment_page(request, post_id):
+    """Пачка комментариев от новых к старым после курсора ?after=."""
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    )
+    return CursorPaginator(
+        comments, settings.COMMENT_PAGE_SIZE, COMMENT_KEYS
+    ).get_page(after=request.GET.get('after'))
+
+
+@require_safe
+def post_comments(request, post_id):
+    """Следующая пачка комментариев для кнопки «Показать ещё»."""
+    comments = comment_page(request, post_id)
+    if not comments and not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    context = {'post_id': post_id,
+               'comments': comments,
+               }
+    return render(request, 'includes/comment_list.html', context)
+
+
+def post_search(request):
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    posts = search.search(query)
+    page_obj = paginator.page(posts, request, mode='numbered')
+    context = {'query': query,
+               'page_obj': page_obj,
+               'page_params': urlencode({'q': query}) + '&',
+               }
+    return render(request, template, context)
+
+
 @login_required
 def post_create(request):
     template = 'posts/create_post.html'
@@ -88,7 +150,7 @@ def post_edit(request, post_id):
     form = PostForm(request.POST or None,
                     files=request.FILES or None,
                     instance=post)
-    if post.author != request.user:
+    if post.author_id != request.user.id:
         return redirect('posts:index')
     if form.is_valid():
         form.save()
@@ -99,12 +161,30 @@ def post_edit(request, post_id):
 @login_required
 def follow_index(request):
     template = 'posts/follow.html'
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator.page(posts, request)
-    context = {'page_obj': page_obj, }
+    posts = timeline.feed(request.user)
+    page_obj = paginator.page(posts, request, keys=timeline.FEED_KEYS)
+    context = {'page_obj': page_obj,
+               'recommendations': recommendations.for_user(request.user),
+               }
     return render(request, template, context)
 
 
+@require_safe
+@never_cache
+def follow_states(request):
+    """Состояние кнопок подписки для авторов ?authors=1,2,3.
+
+    Закэшированные ленты одинаковы для подписанных и нет, а кнопки
+    на карточках заполняет скрипт по этому ответу.
+    """
+    raw = request.GET.get('authors', '').split(',')
+    author_ids = [int(value) for value in raw if value.isdigit()]
+    states = follows.states(request.user,
+                            author_ids[:settings.FOLLOW_STATES_LIMIT])
+    return JsonResponse({str(author_id): following
+                         for author_id, following in states.items()})
+
+
 @login_required
 def profile_follow(request, username):
     user = request.user
@@ -119,3 +199,48 @@ def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.get(user=request.user, author=author).delete()
     return redirect('posts:follow_index')
+
+
+@require_safe
+def resized_image(request, width, height, mode, extension, name):
+    """Вариант картинки по подписанной ссылке из resize.url: нарезается
+    один раз и дальше отдаётся с диска. На год кэшируются только
+    варианты картинок с именем по хэшу."""
+    spec = (name, width, height, mode, extension)
+    if (mode not in resize.MODES or extension not in resize.FORMATS
+            or not width or not height
+            or not resize.verify(request.GET.get('s', ''), *spec)):
+        raise Http404
+    try:
+        path = resize.get(*spec)
+    except OSError:
+        raise Http404
+    accel_url = settings.RESIZE_ACCEL_URL + os.path.relpath(
+        path, settings.RESIZE_CACHE_ROOT
+    )
+    return file_response(request, path,
+                         media_cache_control(resize.is_immutable(name)),
+                         resize.key(*spec), accel_url)
+
+
+def media_cache_control(immutable):
+    if immutable:
+        return IMMUTABLE
+    return f'public, max-age={settings.MEDIA_MAX_AGE}'
+
+
+@require_safe
+def media(request, path):
+    """Медиафайлы. Картинки с именем по хэшу содержимого и их миниатюры
+    никогда не меняются и кэшируются на год, остальные — на
+    MEDIA_MAX_AGE."""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    immutable = (bool(HASHED_NAME.search(path))
+                 or thumbnails.is_immutable(path))
+    return file_response(request, full_path, media_cache_control(immutable),
+                         accel_url=settings.MEDIA_ACCEL_URL + path)
@@ -1,9 +1,177 @@
+import base64
+import binascii
+
+from django.conf import settings
 from django.core.paginator import Paginator
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
 
 PAGE_NUM = 10
+PAGE_LINKS_ON_EACH_SIDE = 3
+CURSOR_KEYS = ('pub_date', 'id')
+CURSOR_PARAMS = ('after', 'before')
+# Ключи курсора — первичные ключи: больше 64 бит их не хранит ни одна
+# база, а SQLite на таком числе падает с OverflowError.
+CURSOR_PK_MAX = 2 ** 63 - 1
+
+
+def encode_cursor(obj, keys=CURSOR_KEYS):
+    stamp, pk = (getattr(obj, key) for key in keys)
+    raw = f'{stamp.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """(момент, id) из токена или None для испорченного токена:
+    чужой формат, момент без часового пояса, id вне диапазона ключей."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        stamp, pk = raw.decode().split('|')
+        stamp = parse_datetime(stamp)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if stamp is None or timezone.is_naive(stamp):
+        return None
+    if not 0 <= pk <= CURSOR_PK_MAX:
+        return None
+    return stamp, pk
+
+
+class CursorPage:
+    """Страница keyset-пагинации: не считает строки и не использует OFFSET."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage after={self.next_cursor}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    def __init__(self, query, per_page, keys=CURSOR_KEYS):
+        self.query = query
+        self.per_page = per_page
+        self.keys = keys
+
+    def _filter(self, cursor, lookup):
+        stamp_key, pk_key = self.keys
+        stamp, pk = cursor
+        return self.query.filter(
+            Q(**{f'{stamp_key}__{lookup}': stamp})
+            | Q(**{stamp_key: stamp, f'{pk_key}__{lookup}': pk})
+        )
+
+    def get_page(self, after=None, before=None):
+        stamp_key, pk_key = self.keys
+        descending = ('-' + stamp_key, '-' + pk_key)
+        after = after and decode_cursor(after)
+        before = before and decode_cursor(before)
+        limit = self.per_page + 1
+        if before:
+            rows = list(self._filter(before, 'gt')
+                        .order_by(stamp_key, pk_key)[:limit])
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_previous, has_next = has_more, bool(rows)
+        else:
+            query = self._filter(after, 'lt') if after else self.query
+            rows = list(query.order_by(*descending)[:limit])
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_previous = bool(after) and bool(rows)
+        return CursorPage(
+            rows,
+            encode_cursor(rows[-1], self.keys) if has_next else None,
+            encode_cursor(rows[0], self.keys) if has_previous else None,
+        )
+
+
+def page_window(page, on_each_side=PAGE_LINKS_ON_EACH_SIDE):
+    """Номера страниц вокруг текущей: шаблон выводит ссылки только
+    на соседние страницы, а не на все подряд."""
+    first = max(1, page.number - on_each_side)
+    last = min(page.paginator.num_pages, page.number + on_each_side)
+    return range(first, last + 1)
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator без точного COUNT(*) по большим таблицам.
+
+    Без фильтров число строк оценивается по MAX(pk), с фильтрами
+    считается не дальше ESTIMATED_COUNT_LIMIT строк.
+    """
+
+    @cached_property
+    def count(self):
+        query = self.object_list
+        if not query.query.where:
+            last = query.model._default_manager.aggregate(last=Max('pk'))
+            return last['last'] or 0
+        return query.order_by()[:settings.ESTIMATED_COUNT_LIMIT].count()
+
+    def page(self, number):
+        """Страница с поправкой оценки.
+
+        MAX(pk) завышает число строк, если часть строк удалена, и
+        последние номера страниц оказываются неполными или пустыми.
+        Неполная страница даёт точное число строк, а на пустой оно
+        пересчитывается COUNT(*): номера за концом дают EmptyPage.
+        """
+        page = super().page(number)
+        rows = len(page.object_list)
+        if rows < self.per_page:
+            if rows or page.number == 1:
+                self._set_count((page.number - 1) * self.per_page + rows)
+            else:
+                self._set_count(self.object_list.count())
+                return super().page(number)
+        return page
+
+    def _set_count(self, count):
+        self.__dict__['count'] = count
+        self.__dict__.pop('num_pages', None)
+
 
+def page(query, request, mode=None, keys=CURSOR_KEYS, count=None):
+    """Страница query по настройке PAGINATION_MODE или явному mode.
 
-def page(query, request):
+    Без явного mode параметры ?after/?before включают курсорный режим;
+    явный mode='numbered' их игнорирует.
+    """
+    after, before = (request.GET.get(param) for param in CURSOR_PARAMS)
+    if mode is None:
+        mode = ('cursor' if after or before
+                else settings.PAGINATION_MODE)
+    if mode == 'cursor':
+        return CursorPaginator(query, PAGE_NUM, keys).get_page(after, before)
     paginator = Paginator(query, PAGE_NUM)
+    if count is not None:
+        # Заранее известное число строк избавляет от запроса COUNT(*).
+        paginator.count = count
     page_numer = request.GET.get('page')
     return paginator.get_page(page_numer)
@@ -28,10 +28,13 @@ INSTALLED_APPS = [
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -102,9 +105,114 @@ STATIC_URL = '/static/'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-
+# Условные заголовки медиафайлов проверяет Django, а байты может отдать
+# веб-сервер: 'x-sendfile' — путь на диске в X-Sendfile (Apache, lighttpd),
+# 'x-accel-redirect' — внутренний адрес nginx из MEDIA_ACCEL_URL и
+# RESIZE_ACCEL_URL. None — файл отдаёт сам Django через FileResponse.
+MEDIA_OFFLOAD = None
+MEDIA_ACCEL_URL = '/internal/media/'
+# Сколько кэшируются медиафайлы, имя которых не зависит от содержимого.
+MEDIA_MAX_AGE = 60 * 60
+
+# Страницы, поколения и подписки сбрасываются при записи только в том
+# кэше, который видит писавший процесс. С несколькими процессами нужен
+# общий бэкенд (memcached, redis, FileBasedCache): с LocMemCache сроки
+# этих записей урезаются до LOCAL_CACHE_TIMEOUT (см. core.caches).
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+LOCAL_CACHE_TIMEOUT = 20
+
+# 'numbered' — классическая пагинация со счётчиком страниц,
+# 'cursor' — keyset-пагинация по (pub_date, id) без COUNT(*) и OFFSET.
+PAGINATION_MODE = 'numbered'
+
+# Авторы, у которых подписчиков больше этого порога, не раскладываются
+# по лентам при публикации: их посты подмешиваются в ленту при чтении.
+TIMELINE_FANOUT_LIMIT = 1000
+# Сколько последних постов автора добавляется в ленту при подписке.
+TIMELINE_BACKFILL = 500
+
+# Закэшированные страницы лент сбрасываются сигналами при записи,
+# поэтому в общем кэше могут жить долго; с LocMemCache — не дольше
+# LOCAL_CACHE_TIMEOUT.
+PAGE_CACHE_TIMEOUT = 60 * 60 * 6
+# Подписки пользователя для кнопок «Подписаться» кэшируются целиком
+# и сбрасываются сигналами при подписке и отписке.
+FOLLOWEES_CACHE_TIMEOUT = 60 * 60 * 24
+# Сколько авторов за раз принимает follow_states.
+FOLLOW_STATES_LIMIT = 100
+
+# Миниатюры нарезаются сразу после сохранения поста в фоновых потоках;
+# при THUMBNAIL_WORKERS = 0 — в том же потоке после коммита.
+THUMBNAIL_BACKEND = 'posts.thumbnails.LockingThumbnailBackend'
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_LOCK_TIMEOUT = 60
+THUMBNAIL_LOCK_WAIT = 10
+THUMBNAIL_URL_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Сколько комментариев показывается на странице поста и догружается
+# кнопкой «Показать ещё».
+COMMENT_PAGE_SIZE = 20
+
+# Виджет «Кого почитать» на странице подписок: сколько авторов показать
+# и за сколько дней посты автора повышают его вес. Рекомендации
+# пересчитывает команда recommend_authors.
+RECOMMENDATIONS_SIZE = 5
+RECOMMENDATION_ACTIVITY_DAYS = 30
+
+# Размер страницы JSON API (/api/v1/).
+API_PAGE_SIZE = 20
+
+# Сколько последних постов попадает в RSS- и Atom-ленты.
+FEED_SIZE = 20
+
+# Загруженные картинки уменьшаются до IMAGE_MAX_SIDE по большей стороне
+# и перекодируются без метаданных; больше IMAGE_MAX_PIXELS не декодируются.
+IMAGE_MAX_SIDE = 1920
+IMAGE_MAX_PIXELS = 50_000_000
+IMAGE_FORMAT = 'JPEG'
+IMAGE_QUALITY = 85
+# Загрузка, ещё не закоммиченная, не даёт удалить файл с тем же
+# содержимым: заявка и блокировка лежат в базе (posts.StoredImage) и
+# видны всем процессам; заявка откатившейся загрузки живёт
+# IMAGE_CLAIM_TIMEOUT.
+IMAGE_CLAIM_TIMEOUT = 60 * 60
+
+# Варианты картинок по подписанным ссылкам /resize/ нарезаются один раз
+# и хранятся на диске; при переполнении удаляются давно не запрошенные.
+# RESIZE_WIDTHS — ширины для srcset.
+RESIZE_CACHE_ROOT = os.path.join(BASE_DIR, 'resized')
+RESIZE_ACCEL_URL = '/internal/resized/'
+RESIZE_CACHE_MAX_BYTES = 1024 ** 3
+RESIZE_WIDTHS = (480, 960, 1440)
+
+# Учёт SQL-запросов на view: бюджеты объявляются в posts/urls.py.
+# manage.py test включает строгий режим для всех тестов (core.runner).
+QUERY_BUDGET_ENABLED = DEBUG
+QUERY_BUDGET_STRICT = False
+QUERY_REPEAT_LIMIT = 3
+TEST_RUNNER = 'core.runner.QueryBudgetRunner'
+
+# Заголовок Server-Timing и строка лога с временем SQL, шаблонов и миниатюр.
+SERVER_TIMING_ENABLED = False
+
+# Списки в админке не считают строки точно: без фильтров число берётся
+# из MAX(id), с фильтрами COUNT(*) останавливается на этом пороге.
+ESTIMATED_COUNT_LIMIT = 10000
+
+# Поиск по постам: релевантность bm25 ослабевает вдвое для поста
+# такого возраста в днях.
+SEARCH_RECENCY_DAYS = 30
+
+# Команда benchmark: базовая линия хранится в репозитории, прогон падает,
+# если выросло число запросов страницы или её p50/p95 выросли больше чем
+# на BENCHMARK_THRESHOLD плюс BENCHMARK_NOISE_FACTOR разбросов замеров.
+# Первые BENCHMARK_WARMUP кругов не считаются.
+BENCHMARK_BASELINES = os.path.join(BASE_DIR, 'benchmarks.json')
+BENCHMARK_THRESHOLD = 0.25
+BENCHMARK_NOISE_FACTOR = 3
+BENCHMARK_REPEAT = 50
+BENCHMARK_WARMUP = 5